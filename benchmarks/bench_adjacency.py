@@ -0,0 +1,119 @@
+"""
+Operaciones sobre los amigos de un usuario según su grado: lista (como se
+guardaban antes en memoria) contra un dict {amigo: None}, el conjunto
+ordenado que UserRecord usa para los usuarios con más de HUB_DEGREE amigos
+(los demás usan un array('I') de ids).
+
+Mide agregar un amigo nuevo (revisar que no esté y agregarlo), eliminar
+uno existente y la pregunta "¿es amigo?" que hace search_user por cada
+candidato, para grados de 10, 1k y 100k. Al final mide add_friend +
+remove_friend reales sobre un UserDataBase con un usuario de ese grado.
+
+Uso: python benchmarks/bench_adjacency.py [--degrees 10 1000 100000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from database import UserDataBase
+
+DEFAULT_DEGREES = [10, 1_000, 100_000]
+TIME_BUDGET = 1.0   # Segundos por operación y estructura
+MIN_OPS = 20
+
+# Versión anterior de _apply sobre listas
+def list_add(friends, user):
+    if user not in friends:
+        friends.append(user)
+
+def list_remove(friends, user):
+    if user in friends:
+        friends.remove(user)
+
+def set_add(friends, user):
+    friends.setdefault(user)
+
+def set_remove(friends, user):
+    friends.pop(user, None)
+
+# (nombre, construir, agregar, eliminar, deshacer el último agregado en O(1))
+STRUCTURES = [
+    ("lista", list, list_add, list_remove, list.pop),
+    ("conjunto", dict.fromkeys, set_add, set_remove, dict.popitem)
+]
+
+def measure(operation) -> float:
+    """Microsegundos promedio por llamada dentro del presupuesto de tiempo"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + TIME_BUDGET
+    while count < MIN_OPS or time.perf_counter() < deadline:
+        operation()
+        count += 1
+    return (time.perf_counter() - start) / count * 1e6
+
+def bench_structure(degree: int, build, add, remove, pop_last):
+    rng = random.Random(degree)
+    names = [f"user{i}" for i in range(degree)]
+    friends = build(names)
+
+    def add_new():
+        # Se deshace para mantener el grado constante
+        add(friends, "nuevo")
+        pop_last(friends)
+    def remove_existing():
+        # Se vuelve a agregar para mantener el grado constante
+        user = names[rng.randrange(degree)]
+        remove(friends, user)
+        add(friends, user)
+    def contains():
+        return names[rng.randrange(degree)] in friends
+
+    return measure(add_new), measure(remove_existing), measure(contains)
+
+def bench_database(degree: int) -> float:
+    """add_friend + remove_friend reales sobre el usuario de mayor grado"""
+    users = {f"user{i}": {"name": f"Usuario {i}", "photo": "", "password_hash": "x", "friends": []}
+             for i in range(degree + 1)}
+    users["hub"] = {"name": "Hub", "photo": "", "password_hash": "x", "friends": list(users)}
+    for i in range(degree + 1):
+        users[f"user{i}"]["friends"].append("hub")
+    users["nuevo"] = {"name": "Nuevo", "photo": "", "password_hash": "x", "friends": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.json")
+        with open(path, 'w') as f:
+            json.dump({"users": users}, f)
+        del users
+        db = UserDataBase(path, compact_threshold=10 ** 9, compact_interval=0)
+        def toggle():
+            db.add_friend("hub", "nuevo")
+            db.remove_friend("hub", "nuevo")
+        elapsed = measure(toggle)
+        db.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la lista de amigos en memoria")
+    parser.add_argument("--degrees", type=int, nargs="+", default=DEFAULT_DEGREES)
+    args = parser.parse_args()
+
+    print(f"{'Grado':>7} | {'Estructura':>10} | {'Agregar (µs)':>12} | {'Eliminar (µs)':>13} | {'¿Amigo? (µs)':>12}")
+    print("-" * 67)
+    for degree in args.degrees:
+        for name, *operations in STRUCTURES:
+            add_us, remove_us, contains_us = bench_structure(degree, *operations)
+            print(f"{degree:>7} | {name:>10} | {add_us:12.2f} | {remove_us:13.2f} | {contains_us:12.2f}")
+
+    print()
+    print(f"{'Grado':>7} | {'add_friend + remove_friend en UserDataBase (µs)':>47}")
+    print("-" * 58)
+    for degree in args.degrees:
+        print(f"{degree:>7} | {bench_database(degree):47.1f}")
+
+if __name__ == '__main__':
+    main()
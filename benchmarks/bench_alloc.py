@@ -0,0 +1,115 @@
+"""
+Copias y memoria por frame: camino anterior con str (json.dumps -> encode ->
+Fernet -> decode -> encode para el socket, y el inverso al recibir) contra
+el camino bytes a bytes (codec -> FernetCipher -> header aparte).
+
+Para cada camino cuenta los buffers del tamaño del payload que crea cada
+paso (copias visibles), el pico de memoria medido con tracemalloc en
+múltiplos del payload, y el tiempo por frame.
+
+Uso: python benchmarks/bench_alloc.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.ciphers import FernetCipher
+from shared.framing import frame_header
+from shared.serialization import DEFAULT_CODEC
+from cryptography.fernet import Fernet
+
+SIZES = [("1 KB", 1024), ("100 KB", 100 * 1024), ("1 MB", 1024 * 1024)]
+TOTAL_BYTES = 32 * 1024 * 1024  # Volumen procesado por medición de tiempo
+
+def legacy_steps(key: bytes):
+    """Pasos del camino anterior; encrypt_data/decrypt_data desglosados
+
+    AuthManager.encrypt_data era cipher.encrypt(data.encode()).decode() y
+    decrypt_data el inverso, así que cada llamada sumaba dos conversiones.
+    """
+    cipher = Fernet(key)
+    send = [
+        json.dumps,
+        str.encode,                                  # encrypt_data: str -> bytes
+        cipher.encrypt,
+        bytes.decode,                                # encrypt_data: retorna str
+        str.encode,                                  # Para el socket
+        lambda data: len(data).to_bytes(4, 'big') + data
+    ]
+    receive = [
+        bytes.decode,                                # Lectura como str
+        str.encode,                                  # decrypt_data: str -> bytes
+        cipher.decrypt,
+        bytes.decode,                                # decrypt_data: retorna str
+        json.loads
+    ]
+    return send, receive, lambda frame: frame[4:]
+
+def bytes_steps(key: bytes):
+    cipher = FernetCipher(key)
+    send = [
+        DEFAULT_CODEC.encode,
+        cipher.encrypt,
+        lambda data: (frame_header(len(data)), data)  # Header aparte (sendmsg)
+    ]
+    receive = [
+        cipher.decrypt,
+        DEFAULT_CODEC.decode
+    ]
+    return send, receive, lambda frame: frame[1]
+
+def run(steps, value):
+    for step in steps:
+        value = step(value)
+    return value
+
+def count_copies(steps, value, size: int) -> int:
+    """Pasos que producen un objeto nuevo de al menos el tamaño del payload"""
+    copies = 0
+    for step in steps:
+        result = step(value)
+        if result is not value and sys.getsizeof(result) >= size:
+            copies += 1
+        value = result
+    return copies
+
+def peak_ratio(steps, value, size: int) -> float:
+    """Pico de memoria durante un frame, en múltiplos del payload"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    run(steps, value)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (peak - baseline) / size
+
+def per_frame_us(send, receive, payload_of, message, size: int) -> float:
+    count = max(1, TOTAL_BYTES // size)
+    start = time.perf_counter()
+    for _ in range(count):
+        run(receive, payload_of(run(send, message)))
+    return (time.perf_counter() - start) / count * 1e6
+
+def main():
+    key = Fernet.generate_key()
+    paths = [("str", legacy_steps(key)), ("bytes", bytes_steps(key))]
+
+    print(f"{'Frame':>7} | {'Camino':>6} | {'Copias env':>10} | {'Copias rec':>10} | "
+          f"{'Pico env':>8} | {'Pico rec':>8} | {'µs/frame':>9}")
+    print("-" * 80)
+    for label, size in SIZES:
+        message = {"action": "update_profile", "username": "ana", "photo": "A" * size}
+        for name, (send, receive, payload_of) in paths:
+            # El receptor lee el header aparte y procesa solo el payload
+            frame = payload_of(run(send, message))
+            assert run(receive, frame) == message
+            print(f"{label:>7} | {name:>6} | {count_copies(send, message, size):>10} | "
+                  f"{count_copies(receive, frame, size):>10} | "
+                  f"{peak_ratio(send, message, size):7.1f}x | {peak_ratio(receive, frame, size):7.1f}x | "
+                  f"{per_frame_us(send, receive, payload_of, message, size):9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Throughput de cifrado por frame: Fernet (token base64) contra la sesión
+AES-GCM sobre bytes crudos. Mide encriptar + desencriptar y el tamaño en
+el cable de cada frame.
+
+Uso: python benchmarks/bench_cipher.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.ciphers import FernetCipher, AesGcmSession, derive_session_key, new_session_nonce
+from cryptography.fernet import Fernet
+
+SIZES = [("1 KB", 1024), ("100 KB", 100 * 1024), ("5 MB", 5 * 1024 * 1024)]
+TOTAL_BYTES = 64 * 1024 * 1024  # Volumen procesado por medición
+
+def measure(sender, receiver, size: int):
+    """Retorna (bytes/seg, tamaño del frame cifrado)"""
+    data = os.urandom(size)
+    count = max(1, TOTAL_BYTES // size)
+    start = time.perf_counter()
+    for _ in range(count):
+        frame = sender.encrypt(data)
+        assert len(receiver.decrypt(frame)) == size
+    elapsed = time.perf_counter() - start
+    return size * count / elapsed, len(frame)
+
+def main():
+    shared_key = Fernet.generate_key()
+    fernet = FernetCipher(shared_key)
+    session_key = derive_session_key(shared_key, new_session_nonce(), new_session_nonce())
+
+    print(f"{'Frame':>8} | {'Fernet (MB/s)':>13} | {'AES-GCM (MB/s)':>14} | {'Mejora':>6} | {'Bytes Fernet':>12} | {'Bytes AES-GCM':>13}")
+    print("-" * 86)
+    for label, size in SIZES:
+        fernet_rate, fernet_len = measure(fernet, fernet, size)
+        # Emisor y receptor separados: cada uno lleva su propio contador
+        client = AesGcmSession(session_key, is_server=False)
+        server = AesGcmSession(session_key, is_server=True)
+        gcm_rate, gcm_len = measure(client, server, size)
+        print(f"{label:>8} | {fernet_rate / 1e6:13.1f} | {gcm_rate / 1e6:14.1f} | {gcm_rate / fernet_rate:5.1f}x | "
+              f"{fernet_len:>12} | {gcm_len:>13}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Costo/beneficio de la compresión negociada por acción: tasa de compresión,
+tamaño final del token Fernet y CPU por frame, para respuestas con la misma
+forma que las de _handle_search_users, _handle_get_friends,
+_handle_get_suggestions y _handle_find_path.
+
+Uso: python benchmarks/bench_compression.py
+"""
+import base64
+import json
+import os
+import random
+import sys
+
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.compression import DEFAULT_THRESHOLD, CompressionStats
+
+REPEAT = 20
+
+def fake_user(i: int) -> dict:
+    # Las fotos reales son JPEG (ya comprimido) en base64
+    photo = base64.b64encode(os.urandom(random.randint(8_000, 30_000))).decode()
+    return {
+        "name": f"Usuario {i}",
+        "username": f"user{i}",
+        "photo": photo,
+        "friend_count": random.randint(0, 200)
+    }
+
+def build_responses() -> dict:
+    random.seed(1)
+    users = [fake_user(i) for i in range(60)]
+    return {
+        "search_user": {"status": "success", "users": [dict(u, is_friend=False) for u in users]},
+        "get_friends": {"status": "success", "friends": users[:25]},
+        "get_suggestions": {"status": "success", "suggestions": [dict(u, common_friends=2) for u in users[:10]]},
+        "find_path": {"status": "success", "path": ["user1", "user7", "user42"]},
+        "search_user (sin fotos)": {"status": "success", "users": [
+            dict(u, photo="", is_friend=False) for u in users
+        ]}
+    }
+
+def main():
+    cipher = Fernet(Fernet.generate_key())
+    stats = CompressionStats()
+
+    wire_plain = {}
+    wire_compressed = {}
+    for action, response in build_responses().items():
+        data = json.dumps(response).encode()
+        for _ in range(REPEAT):
+            payload = stats.compress(action, data, DEFAULT_THRESHOLD)
+        wire_plain[action] = len(cipher.encrypt(data))
+        wire_compressed[action] = len(cipher.encrypt(payload))
+
+    print(f"{'Acción':<24} | {'JSON':>10} | {'Tasa':>5} | {'Token sin':>10} | {'Token con':>10} | {'CPU/frame':>10}")
+    print("-" * 86)
+    for action, entry in stats.snapshot().items():
+        print(f"{action:<24} | {entry['raw_bytes'] // entry['frames']:>10} | {entry['ratio']:4.2f}x | "
+              f"{wire_plain[action]:>10} | {wire_compressed[action]:>10} | {entry['cpu_ms_per_frame']:7.3f} ms")
+
+if __name__ == '__main__':
+    main()
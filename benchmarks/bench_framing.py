@@ -0,0 +1,68 @@
+"""
+Micro-benchmark de recepción de frames: lectura anterior (bytes += chunk de
+4096 y conversión str) contra shared/framing.py (recv_into en buffer
+preasignado). Mide bytes/seg sobre un socketpair local.
+
+Uso: python benchmarks/bench_framing.py
+"""
+import base64
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.framing import recv_frame, send_frame
+
+SIZES = [("1 KB", 1024), ("100 KB", 100 * 1024), ("5 MB", 5 * 1024 * 1024)]
+TOTAL_BYTES = 64 * 1024 * 1024  # Volumen transferido por medición
+
+def recv_frame_legacy(sock: socket.socket) -> bytes:
+    """Copia del bucle original de handle_client / _send_encrypted_request"""
+    length_bytes = sock.recv(4)
+    message_length = int.from_bytes(length_bytes, 'big')
+    encrypted_data = b""
+    while len(encrypted_data) < message_length:
+        chunk = sock.recv(min(4096, message_length - len(encrypted_data)))
+        if not chunk:
+            break
+        encrypted_data += chunk
+    # Ida y vuelta por str antes de pasar al cifrado
+    return encrypted_data.decode().encode()
+
+def recv_frame_new(sock: socket.socket) -> bytes:
+    return bytes(recv_frame(sock))
+
+def measure(receiver, size: int) -> float:
+    """Bytes/seg recibiendo frames de tamaño size"""
+    payload = base64.urlsafe_b64encode(os.urandom(size))[:size]  # Como un token Fernet
+    count = max(1, TOTAL_BYTES // size)
+    a, b = socket.socketpair()
+
+    def sender():
+        for _ in range(count):
+            send_frame(a, payload)
+
+    thread = threading.Thread(target=sender)
+    start = time.perf_counter()
+    thread.start()
+    for _ in range(count):
+        frame = receiver(b)
+        assert len(frame) == size
+    elapsed = time.perf_counter() - start
+    thread.join()
+    a.close()
+    b.close()
+    return size * count / elapsed
+
+def main():
+    print(f"{'Frame':>8} | {'Antes (MB/s)':>13} | {'Después (MB/s)':>15} | {'Mejora':>7}")
+    print("-" * 54)
+    for label, size in SIZES:
+        before = measure(recv_frame_legacy, size)
+        after = measure(recv_frame_new, size)
+        print(f"{label:>8} | {before / 1e6:13.1f} | {after / 1e6:15.1f} | {after / before:6.2f}x")
+
+if __name__ == '__main__':
+    main()
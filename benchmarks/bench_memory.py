@@ -0,0 +1,101 @@
+"""
+Memoria de la base JSON en el servidor según cómo se guarda cada usuario:
+un dict por usuario con sus amigos en un dict {username: None} (como era
+antes), UserRecord con __slots__ y amigos como array('I') de ids (lo que
+usa UserDataBase; cargado del JSON y del snapshot binario) y
+LazyUserDataBase, que solo deja residentes los usernames.
+
+Genera un users.json sintético por tamaño (grado promedio --degree),
+carga cada variante y mide con tracemalloc la memoria que queda en uso
+después de cargar y el pico durante la carga.
+
+Uso: python benchmarks/bench_memory.py [--users 100000 1000000] [--degree 10]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from database import UserDataBase
+from lazy_database import LazyUserDataBase
+
+DEFAULT_USERS = [100_000, 1_000_000]
+
+def generate(path: str, count: int, degree: int):
+    """users.json con count usuarios y amigos al azar, escrito de a un usuario"""
+    rng = random.Random(count)
+    with open(path, 'w') as f:
+        f.write('{"users": {')
+        for i in range(count):
+            friends = [f"user{rng.randrange(count)}" for _ in range(rng.randint(0, 2 * degree))]
+            record = {"name": f"Usuario {i}", "photo": f"{i:064x}",
+                      "password_hash": f"pbkdf2$100000${i:032x}${i:064x}", "friends": friends}
+            f.write(f'{", " if i else ""}"user{i}": {json.dumps(record)}')
+        f.write("}}")
+
+def load_dicts(path: str):
+    """Carga anterior: dict por usuario y amigos como dict {username: None}"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    for user_data in data["users"].values():
+        user_data["friends"] = dict.fromkeys(user_data.get("friends", ()))
+    return data
+
+def open_database_json(path: str):
+    return UserDataBase(path, compact_interval=0, binary_snapshot=False)
+
+def open_database(path: str):
+    return UserDataBase(path, compact_interval=0)
+
+def open_lazy(path: str):
+    return LazyUserDataBase(path, compact_interval=0)
+
+VARIANTS = [
+    ("dicts", load_dicts),
+    ("UserRecord", open_database_json),
+    ("+ .snap", open_database),
+    ("a pedido", open_lazy)
+]
+
+def measure(load, path: str):
+    """(MB en uso después de cargar, MB de pico, segundos)"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    loaded = load(path)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Las bases no se cierran: close compacta y eso no es parte de la carga
+    del loaded
+    gc.collect()
+    return (current - baseline) / 1e6, (peak - baseline) / 1e6, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memoria de la base JSON")
+    parser.add_argument("--users", type=int, nargs="+", default=DEFAULT_USERS)
+    parser.add_argument("--degree", type=int, default=10, help="Amigos promedio por usuario")
+    args = parser.parse_args()
+
+    print(f"{'Usuarios':>9} | {'Variante':>10} | {'En uso (MB)':>11} | {'Pico (MB)':>9} | {'Bytes/usuario':>13} | {'Carga (s)':>9}")
+    print("-" * 78)
+    for count in args.users:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "users.json")
+            generate(path, count, args.degree)
+            # Deja escrito el snapshot binario que leen "+ .snap" y LazyUserDataBase
+            open_lazy(path)
+            for name, load in VARIANTS:
+                current, peak, elapsed = measure(load, path)
+                print(f"{count:>9} | {name:>10} | {current:11.1f} | {peak:9.1f} | "
+                      f"{current * 1e6 / count:13.0f} | {elapsed:9.2f}")
+
+if __name__ == '__main__':
+    main()
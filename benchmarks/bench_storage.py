@@ -0,0 +1,104 @@
+"""
+Latencia de mutaciones por backend de usuarios: JSON (una línea en el log
+de mutaciones por cambio) contra SQLite en modo WAL (escribe solo las filas
+tocadas). Mide add_user, add_friend, remove_friend y update_user sobre
+bases de 10k, 100k y 1M usuarios con ~4 amistades cada uno.
+
+Uso: python benchmarks/bench_storage.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from database import UserDataBase
+from sqlite_database import SqliteUserDataBase
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+FRIENDS_PER_USER = 4
+TIME_BUDGET = 2.0   # Segundos por operación y backend
+MIN_OPS, MAX_OPS = 3, 500
+PASSWORD_HASH = "$pbkdf2-sha256$30000$" + "x" * 22 + "$" + "y" * 43
+
+def build_users(count: int) -> dict:
+    """Usuarios sintéticos con amistades aleatorias bidireccionales"""
+    rng = random.Random(count)
+    users = {
+        f"user{i}": {"name": f"Usuario {i}", "photo": "", "password_hash": PASSWORD_HASH, "friends": []}
+        for i in range(count)
+    }
+    for i in range(count):
+        for j in rng.sample(range(count), FRIENDS_PER_USER // 2):
+            if i != j and f"user{j}" not in users[f"user{i}"]["friends"]:
+                users[f"user{i}"]["friends"].append(f"user{j}")
+                users[f"user{j}"]["friends"].append(f"user{i}")
+    return users
+
+def operations(count: int):
+    """Genera (nombre, función) con argumentos distintos en cada llamada"""
+    rng = random.Random(7)
+    new_ids = iter(range(count, count * 2))
+    def add_user(db):
+        db.add_user(f"user{next(new_ids)}", PASSWORD_HASH, "Nuevo")
+    def add_friend(db):
+        db.add_friend(f"user{rng.randrange(count)}", f"user{rng.randrange(count)}")
+    def remove_friend(db):
+        user = f"user{rng.randrange(count)}"
+        friends = db.get_user(user)["friends"]
+        db.remove_friend(user, friends[0] if friends else "user0")
+    def update_user(db):
+        db.update_user(f"user{rng.randrange(count)}", name="Renombrado")
+    return [("add_user", add_user), ("add_friend", add_friend),
+            ("remove_friend", remove_friend), ("update_user", update_user)]
+
+def measure(db, operation) -> float:
+    """Mediana en milisegundos de la operación dentro del presupuesto de tiempo"""
+    timings = []
+    deadline = time.perf_counter() + TIME_BUDGET
+    while len(timings) < MAX_OPS and (len(timings) < MIN_OPS or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        operation(db)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de almacenamiento")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+
+    print(f"{'Usuarios':>9} | {'Operación':>13} | {'JSON (ms)':>10} | {'SQLite (ms)':>11} | {'JSON/SQLite':>11}")
+    print("-" * 68)
+    for count in args.sizes:
+        users = build_users(count)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "users.json")
+            with open(json_path, 'w') as f:
+                json.dump({"users": users}, f, indent=2)
+            # Sin snapshot binario: si no, el arranque lo escribe con una
+            # compactación en segundo plano que se superpone con las mediciones
+            json_db = UserDataBase(json_path, compact_threshold=10 ** 9, compact_interval=0,
+                                   binary_snapshot=False)
+            sqlite_db = SqliteUserDataBase(os.path.join(tmp, "users.db"))
+            sqlite_db.import_users(users)
+            del users
+
+            json_ops, sqlite_ops = operations(count), operations(count)
+            for (name, json_op), (_, sqlite_op) in zip(json_ops, sqlite_ops):
+                json_ms = measure(json_db, json_op)
+                sqlite_ms = measure(sqlite_db, sqlite_op)
+                print(f"{count:>9} | {name:>13} | {json_ms:10.3f} | {sqlite_ms:11.3f} | {json_ms / sqlite_ms:10.2f}x")
+
+            # La compactación del log JSON reescribe el snapshot completo (en segundo plano)
+            start = time.perf_counter()
+            json_db.compact()
+            print(f"{count:>9} | {'compactación':>13} | {(time.perf_counter() - start) * 1000:10.1f} | {'-':>11} | {'-':>11}")
+            json_db.close()
+            sqlite_db.close()
+
+if __name__ == '__main__':
+    main()
@@ -2,147 +2,276 @@
 Cliente para SocialTEC - Versión 100% compatible con servidor
 """
 import os
+import sys
 import socket
-import json
-from typing import Dict, Optional
+import itertools
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
 from cryptography.fernet import Fernet
 
+# Código compartido con el servidor (carpeta shared/ en la raíz del proyecto)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.framing import recv_frame, send_frame
+from shared.compression import DEFAULT_THRESHOLD, compress_payload, decompress_payload
+from shared.serialization import DEFAULT_CODEC, get_codec
+from shared.ciphers import FernetCipher, AesGcmSession, derive_session_key, new_session_nonce
+from shared.logs import get_logger
 
-# ========== AUTH MANAGER IDÉNTICO AL SERVIDOR ==========
-class AuthManager:
-    """EXACTAMENTE el mismo que en server/auth.py"""
-    def __init__(self, key: bytes):
-        self.cipher = Fernet(key)  # ← ¡CORRECTO! No recursión
-
-    def encrypt_data(self, data: str) -> str:
-        return self.cipher.encrypt(data.encode()).decode()
-    
-    def decrypt_data(self, encrypted_data: str) -> str:
-        return self.cipher.decrypt(encrypted_data.encode()).decode()
+log = get_logger("client")
+frame_log = get_logger("client.frames")  # Una línea por frame, muestreada
 
 
 # ========== CLIENTE PRINCIPAL ==========
 class Client:
-    def __init__(self, host: str = "localhost", port: int = 8080):
+    def __init__(self, host: str = "localhost", port: int = 8080, timeout: float = 10,
+                 compression: Optional[str] = None, codec: str = DEFAULT_CODEC.name,
+                 cipher: str = FernetCipher.name):
         self.host = host
         self.port = port
+        self.timeout = timeout
+
+        # Compresión pedida al conectar ("zlib") y la que el servidor aceptó
+        self.compression = compression
+        self.active_compression = None
+        self.compression_threshold = DEFAULT_THRESHOLD
+
+        # Codec pedido ("json" o "marshal") y el activo en la conexión actual
+        self.codec = get_codec(codec).name
+        self.active_codec = DEFAULT_CODEC
+
+        # Cifrado pedido ("fernet" o "aesgcm"); Fernet se usa hasta negociar
+        self.cipher = cipher
+        self.active_cipher = None
         self.client_socket = None
         self.connected = False
         self.current_user = None
         self.user_data = None
+        self.token = None  # Token de sesión que entrega login
+
+        # Fotos ya descargadas (id -> base64) y el último id visto por usuario;
+        # un id es el hash del contenido, así que nunca queda desactualizado
+        self.photo_cache: Dict[str, str] = {}
+        self._photo_ids: Dict[str, str] = {}
+
+        # Pipelining: solicitudes en vuelo indexadas por id
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._receiver = None
         
         # Cargar clave COMPARTIDA con servidor
         key_file = "../shared/secret.key"  # ← ¡IMPORTANTE! Misma que servidor
         if os.path.exists(key_file):
             with open(key_file, 'rb') as f:
                 key = f.read()
-                print(f"Clave cargada desde {key_file}")
+                log.info("Clave cargada desde %s", key_file)
         else:
-            print(f"ERROR: No existe {key_file}")
-            print("Ejecuta en terminal: python3 -c \"from cryptography.fernet import Fernet; key = Fernet.generate_key(); open('../shared/secret.key', 'wb').write(key)\"")
+            log.error("No existe %s", key_file)
+            log.error("Ejecuta en terminal: python3 -c \"from cryptography.fernet import Fernet; key = Fernet.generate_key(); open('../shared/secret.key', 'wb').write(key)\"")
             key = Fernet.generate_key()  # Temporal para pruebas
         
-        self.auth = AuthManager(key)
+        self.secret_key = key
+        # Misma implementación que el servidor (shared/ciphers.py), bytes a bytes
+        self.fernet = FernetCipher(key)
         
     def _ensure_connection(self) -> bool:
         """Asegura que haya conexión antes de enviar"""
-        try:
-            if not self.connected or not self.client_socket:
-                return self.connect()
-            # Probar si la conexión sigue activa
-            self.client_socket.settimeout(0.1)
-            self.client_socket.recv(1, socket.MSG_PEEK)
-            self.client_socket.settimeout(10)
-            return True
-        except:
-            # Reconectar si hay error
+        # El hilo receptor marca la conexión como caída cuando el servidor la cierra
+        if not self.connected or not self.client_socket:
             return self.connect()
+        return True
     
     def connect(self) -> bool:
         """Conectar al servidor"""
         try:
-            if self.client_socket:
-                self.client_socket.close()
+            self._close_socket()
             
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client_socket.settimeout(10)  # Timeout de 10 segundos
+            self.client_socket.settimeout(self.timeout)  # Timeout para conectar
             self.client_socket.connect((self.host, self.port))
+            # El hilo receptor espera respuestas indefinidamente; los timeouts
+            # se aplican por solicitud al esperar cada Future
+            self.client_socket.settimeout(None)
             self.connected = True
-            print(f"Conectado al servidor {self.host}:{self.port}")
+            self.active_compression = None
+            self.active_codec = DEFAULT_CODEC
+            self.active_cipher = self.fernet
+
+            self._receiver = threading.Thread(
+                target=self._receive_loop,
+                args=(self.client_socket,),
+                name="socialtec-receiver",
+                daemon=True
+            )
+            self._receiver.start()
+            log.info("Conectado al servidor %s:%s", self.host, self.port)
+            self._negotiate()
+            if self.token:
+                self._resume()
             return True
         except ConnectionRefusedError:
-            print(f"Servidor no disponible en {self.host}:{self.port}")
+            log.warning("Servidor no disponible en %s:%s", self.host, self.port)
             return False
         except Exception as e:
-            print(f"Error conectando: {e}")
+            log.error("Error conectando: %s", e)
             return False
+
+    def _negotiate(self):
+        """Acuerda las opciones de la conexión (debe ser la primera solicitud)"""
+        if not self.compression and self.codec == DEFAULT_CODEC.name and self.cipher == FernetCipher.name:
+            return
+        request_data = {
+            "compression": self.compression,
+            "codec": self.codec,
+            "cipher": self.cipher
+        }
+        if self.cipher == AesGcmSession.name:
+            request_data["client_nonce"] = new_session_nonce()
+
+        response = self._send_encrypted_request("negotiate", request_data)
+        if response.get("status") != "success":
+            log.warning("Negociación rechazada, se continúa con JSON/Fernet sin compresión: %s", response.get("message"))
+            return
+        self.active_compression = response.get("compression")
+        self.compression_threshold = response.get("compression_threshold", DEFAULT_THRESHOLD)
+        self.active_codec = get_codec(response.get("codec", DEFAULT_CODEC.name))
+        if response.get("cipher") == AesGcmSession.name:
+            session_key = derive_session_key(
+                self.secret_key, request_data["client_nonce"], response["server_nonce"]
+            )
+            self.active_cipher = AesGcmSession(session_key, is_server=False)
+
+    def _receive_loop(self, sock: socket.socket):
+        """Lee respuestas y las entrega al Future con el mismo id"""
+        try:
+            while True:
+                # Longitud (4 bytes) y luego el mensaje completo
+                encrypted_response = recv_frame(sock)
+                if encrypted_response is None:
+                    break
+
+                try:
+                    data = self.active_cipher.decrypt(encrypted_response)
+                    if self.active_compression:
+                        data = decompress_payload(data)
+                    response = self.active_codec.decode(data)
+                except Exception as e:
+                    log.error("Error desencriptando respuesta: %s: %s", type(e).__name__, e)
+                    continue
+
+                self._resolve(response.pop("id", None), response)
+        except OSError as e:
+            # Socket cerrado por disconnect(), por el servidor o frame incompleto
+            log.info("Conexión terminada: %s", e)
+        finally:
+            # Si el socket ya fue reemplazado, las solicitudes en vuelo son
+            # de la conexión nueva y no se tocan
+            if sock is self.client_socket:
+                self.connected = False
+                self._fail_pending("Servidor cerró conexión")
+
+    def _resolve(self, request_id, response: Dict):
+        """Completa el Future de la solicitud correspondiente"""
+        with self._pending_lock:
+            if request_id is None:
+                # Respuesta sin id (p. ej. error de framing): la más antigua en vuelo
+                request_id = next(iter(self._pending), None)
+            future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    def _fail_pending(self, message: str):
+        """Resuelve con error todas las solicitudes en vuelo"""
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_result({"status": "error", "message": message})
+
+    def send_async(self, action: str, data: Optional[Dict] = None,
+                   callback: Optional[Callable[[Dict], None]] = None) -> Future:
+        """Envía una solicitud sin esperar la respuesta (pipelining)
+
+        Retorna un Future que se resuelve con el dict de respuesta. Si se pasa
+        callback, se invoca con la respuesta desde el hilo receptor.
+        """
+        future = Future()
+        if callback:
+            future.add_done_callback(lambda f: callback(f.result()))
+
+        # 1. Construir mensaje (LIMITAR foto si es muy grande)
+        request_id = next(self._ids)
+        request = {"action": action, "id": request_id}
+        if self.token and action not in ("login", "register", "negotiate"):
+            request["token"] = self.token
+        if data:
+            request_data = data.copy()
+            # Si hay foto, limitar tamaño
+            if "photo" in request_data and request_data["photo"]:
+                if len(request_data["photo"]) > 50000:  # 50KB en base64
+                    log.warning("Foto demasiado grande, recortando...")
+                    request_data["photo"] = request_data["photo"][:50000]
+            request.update(request_data)
+
+        # Se registra antes de conectar: si el servidor rechaza la conexión
+        # (p. ej. está lleno), su aviso sin id llega a esta solicitud
+        with self._pending_lock:
+            self._pending[request_id] = future
+
+        # 2. Asegurar conexión
+        if not self._ensure_connection():
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            future.set_result({"status": "error", "message": "No se pudo conectar al servidor"})
+            return future
+        if future.done():
+            return future
+
+        try:
+            # 3. Serializar con el codec activo (bytes directo al cifrado)
+            request_data = self.active_codec.encode(request)
+            if self.active_compression:
+                request_data = compress_payload(request_data, self.compression_threshold)
+
+            # 4. ENCRIPTAR Y ENVIAR CON PROTOCOLO DE LONGITUD (4 bytes + mensaje);
+            # se encripta bajo el lock porque AES-GCM numera los frames en orden
+            with self._send_lock:
+                encrypted_request = self.active_cipher.encrypt(request_data)
+                send_frame(self.client_socket, encrypted_request)
+            frame_log.debug("Enviados %d bytes (%s #%d)", len(encrypted_request), action, request_id)
+        except Exception as e:
+            log.error("Error en comunicación: %s: %s", type(e).__name__, e)
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            self.connected = False
+            if not future.done():
+                future.set_result({"status": "error", "message": f"Error de comunicación: {str(e)}"})
+
+        return future
     
+    def _resume(self):
+        """Retoma la sesión al reconectar, sin volver a enviar la contraseña"""
+        response = self._send_encrypted_request("resume")
+        if response.get("status") != "success":
+            log.warning("No se pudo retomar la sesión: %s", response.get("message"))
+            self.token = None
+            return
+        log.info("Sesión retomada: %s", self.current_user)
+
     def _send_encrypted_request(self, action: str, data: Optional[Dict] = None) -> Dict:
-        """Envía solicitud con protocolo de longitud fija"""
+        """Envía solicitud con protocolo de longitud fija y espera su respuesta"""
+        future = self.send_async(action, data)
         try:
-            # 1. Asegurar conexión
-            if not self._ensure_connection():
-                return {"status": "error", "message": "No se pudo conectar al servidor"}
-            
-            # 2. Construir mensaje (LIMITAR foto si es muy grande)
-            request = {"action": action}
-            if data:
-                request_data = data.copy()
-                # Si hay foto, limitar tamaño
-                if "photo" in request_data and request_data["photo"]:
-                    if len(request_data["photo"]) > 50000:  # 50KB en base64
-                        print("Foto demasiado grande, recortando...")
-                        request_data["photo"] = request_data["photo"][:50000]
-                request.update(request_data)
-            
-            # 3. Convertir a JSON y ENCRIPTAR
-            request_json = json.dumps(request, ensure_ascii=False)
-            print(f"JSON tamaño: {len(request_json)} chars")
-            
-            encrypted_request = self.auth.encrypt_data(request_json)
-            print(f"Encriptado: {len(encrypted_request)} chars")
-            
-            # 4. ENVIAR CON PROTOCOLO DE LONGITUD
-            # Primero enviamos la longitud (4 bytes, big-endian)
-            message_length = len(encrypted_request)
-            self.client_socket.send(message_length.to_bytes(4, 'big'))
-            
-            # Luego enviamos el mensaje completo
-            self.client_socket.sendall(encrypted_request.encode('utf-8'))
-            print(f"Enviados {message_length} bytes")
-            
-            # 5. RECIBIR RESPUESTA CON PROTOCOLO DE LONGITUD
-            # Primero recibir longitud (4 bytes)
-            length_bytes = self.client_socket.recv(4)
-            if not length_bytes:
-                return {"status": "error", "message": "Servidor cerró conexión"}
-            
-            response_length = int.from_bytes(length_bytes, 'big')
-            print(f"Esperando respuesta de {response_length} bytes")
-            
-            # Recibir mensaje completo
-            encrypted_response = b""
-            while len(encrypted_response) < response_length:
-                chunk = self.client_socket.recv(min(4096, response_length - len(encrypted_response)))
-                if not chunk:
-                    break
-                encrypted_response += chunk
-            
-            if len(encrypted_response) != response_length:
-                print(f"Respuesta incompleta: {len(encrypted_response)}/{response_length} bytes")
-                return {"status": "error", "message": "Respuesta incompleta del servidor"}
-            
-            print(f"Respuesta completa recibida")
-            
-            # 6. Desencriptar y parsear
-            response_json = self.auth.decrypt_data(encrypted_response.decode('utf-8'))
-            return json.loads(response_json)
-            
-        except socket.timeout:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._pending_lock:
+                for request_id, pending in list(self._pending.items()):
+                    if pending is future:
+                        del self._pending[request_id]
             return {"status": "error", "message": "Timeout del servidor"}
-        except Exception as e:
-            print(f"Error en comunicación: {type(e).__name__}: {e}")
-            return {"status": "error", "message": f"Error de comunicación: {str(e)}"}
     
     # ========== MÉTODOS PRINCIPALES ==========
     
@@ -157,10 +286,56 @@ class Client:
         if response.get("status") == "success":
             self.current_user = username
             self.user_data = response.get("user_data", {})
-            print(f"Login exitoso: {username}")
+            self.token = response.get("token")
+            log.info("Login exitoso: %s", username)
         
         return response
+
+    def logout(self) -> Dict:
+        """Cierra la sesión en el servidor"""
+        if not self.token:
+            return {"status": "error", "message": "No hay sesión activa"}
+        response = self._send_encrypted_request("logout")
+        self.token = None
+        self.current_user = None
+        self.user_data = None
+        return response
+
+    def get_profile(self) -> Dict:
+        """Perfil propio con la foto (login no la incluye)"""
+        if not self.current_user:
+            return {"status": "error", "message": "No hay usuario autenticado"}
+        return self._send_encrypted_request("get_profile", {"username": self.current_user})
     
+    def get_photo(self, photo_id: Optional[str] = None, username: Optional[str] = None) -> str:
+        """Foto en base64 por id o por usuario ("" si no tiene); usa la caché local
+
+        Por id solo se consulta al servidor si no está en caché. Por usuario
+        se envía el último id conocido y el servidor responde not_modified
+        si la foto no cambió.
+        """
+        if photo_id is not None:
+            if not photo_id or photo_id in self.photo_cache:
+                return self.photo_cache.get(photo_id, "")
+            request_data = {"photo_id": photo_id}
+        elif username:
+            request_data = {"username": username}
+            known_id = self._photo_ids.get(username)
+            if known_id in self.photo_cache:
+                request_data["if_none_match"] = known_id
+        else:
+            return ""
+
+        response = self._send_encrypted_request("get_photo", request_data)
+        if response.get("status") != "success":
+            return ""
+        photo_id = response.get("photo_id", "")
+        if username:
+            self._photo_ids[username] = photo_id
+        if not response.get("not_modified") and photo_id:
+            self.photo_cache[photo_id] = response.get("photo", "")
+        return self.photo_cache.get(photo_id, "")
+
     def register(self, username: str, password: str, name: str, photo: str = "") -> Dict:
         """Registrar usuario - LLAMA AL SERVIDOR REAL"""
         request_data = {
@@ -253,6 +428,10 @@ class Client:
         """Obtener estadísticas - LLAMA AL SERVIDOR REAL"""
         return self._send_encrypted_request("get_stats")
     
+    def get_server_metrics(self) -> Dict:
+        """Métricas del servidor: latencias por acción, pool y conexiones"""
+        return self._send_encrypted_request("get_server_metrics")
+    
     def get_suggestions(self) -> Dict:
         """Obtener sugerencias de amigos - LLAMA AL SERVIDOR REAL"""
         if not self.current_user:
@@ -263,13 +442,30 @@ class Client:
         }
         return self._send_encrypted_request("get_suggestions", request_data)
     
+    def batch(self, requests: List[Dict]) -> Dict:
+        """Ejecutar varias acciones en un solo frame
+
+        Cada elemento es un dict con "action" y sus campos; la respuesta trae
+        "results" en el mismo orden, cada uno con su propio "status".
+        """
+        return self._send_encrypted_request("batch", {"requests": requests})
+    
+    def _close_socket(self):
+        """Cierra el socket actual despertando al hilo receptor"""
+        sock, self.client_socket = self.client_socket, None
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
     def disconnect(self):
         """Desconectar"""
         self.connected = False
-        if self.client_socket:
-            self.client_socket.close()
-            self.client_socket = None
-        print("Desconectado del servidor")
+        self._close_socket()
+        self._fail_pending("Desconectado del servidor")
+        log.info("Desconectado del servidor")
     
     def __del__(self):
         """Destructor - cierra conexión"""
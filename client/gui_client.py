@@ -13,6 +13,7 @@ from PyQt6.QtGui import *
 from PIL import Image, ImageQt
 
 from clientTCP import Client
+from shared.logs import setup_logging
 from merge_sort import sort_friends_by_name
 
 
@@ -21,7 +22,8 @@ class LoginWindow(QMainWindow):
 
     def __init__(self):
         super().__init__()
-        self.client = Client()
+        # Las respuestas de amigos/búsqueda traen fotos: pedir compresión
+        self.client = Client(compression="zlib")
         self.setup_ui()
 
     def setup_ui(self):
@@ -260,7 +262,7 @@ class RegisterWindow(QMainWindow):
 
     def __init__(self, client=None):
         super().__init__()
-        self.client = client if client else Client()
+        self.client = client if client else Client(compression="zlib")
         self.photo_data = None
         self.setup_ui()
 
@@ -564,9 +566,29 @@ class MainWindow(QMainWindow):
         self.current_content = None
         self.editin_photo_data = None
 
+        # Pedir amigos y sugerencias a la vez sobre la misma conexión
+        self.prefetched = {
+            "get_friends": self.client.send_async("get_friends", {"username": username}),
+            "get_suggestions": self.client.send_async("get_suggestions", {"username": username}),
+            "get_profile": self.client.send_async("get_profile", {"username": username})
+        }
+
+        # login no trae la foto; el perfil trae su id y la imagen se pide aparte
+        profile = self.take_prefetched("get_profile")
+        if profile and profile.get("status") == "success":
+            self.user_data.update(profile["user_data"])
+            self.user_data['photo'] = self.client.get_photo(self.user_data.get('photo_id', ""))
+
         self.setup_ui()
         self.load_user_friends()
 
+    def take_prefetched(self, action: str):
+        """Retorna la respuesta pedida por adelantado (una sola vez) o None"""
+        future = self.prefetched.pop(action, None)
+        if future is None:
+            return None
+        return future.result(timeout=self.client.timeout)
+
     def setup_ui(self):
         """Configurar interfaz principal"""
         self.setWindowTitle(f"SocialTEC - {self.username}")
@@ -907,7 +929,7 @@ class MainWindow(QMainWindow):
             return
 
         # Obtener sugerencias del servidor
-        response = self.client.get_suggestions()
+        response = self.take_prefetched("get_suggestions") or self.client.get_suggestions()
 
         if response.get("status") != "success":
             error_label = QLabel("No se pudieron cargar las sugerencias")
@@ -964,10 +986,11 @@ class MainWindow(QMainWindow):
         photo_label = QLabel()
         photo_label.setFixedSize(50, 50)
 
-        if suggestion.get('photo'):
+        photo = self.client.get_photo(suggestion.get('photo_id', ""))
+        if photo:
             try:
                 import io
-                photo_bytes = base64.b64decode(suggestion['photo'])
+                photo_bytes = base64.b64decode(photo)
                 image = QImage()
                 if image.loadFromData(photo_bytes):
                     pixmap = QPixmap.fromImage(image)
@@ -1094,7 +1117,8 @@ class MainWindow(QMainWindow):
         if not self.client.current_user:
             return
         
-        response = self.client._send_encrypted_request("get_friends", {"username": self.username})
+        response = (self.take_prefetched("get_friends")
+                    or self.client._send_encrypted_request("get_friends", {"username": self.username}))
         
         if response.get("status") == "success":
             self.user_data["friends"] = response.get("friends", [])
@@ -1201,10 +1225,11 @@ class MainWindow(QMainWindow):
         photo_label = QLabel()
         photo_label.setFixedSize(100, 100)
 
-        if friend.get('photo'):
+        photo = self.client.get_photo(friend.get('photo_id', ""))
+        if photo:
             try:
                 # Método simplificado
-                photo_bytes = base64.b64decode(friend['photo'])
+                photo_bytes = base64.b64decode(photo)
                 
                 # Crear QImage directamente
                 image = QImage()
@@ -1439,12 +1464,13 @@ class MainWindow(QMainWindow):
         # Foto
         photo_label = QLabel()
         photo_label.setFixedSize(60, 60)
-        
-        if user.get('photo'):
+
+        photo = self.client.get_photo(user.get('photo_id', ""))
+        if photo:
             try:
                 import io
                 from PIL import Image
-                photo_bytes = base64.b64decode(user['photo'])
+                photo_bytes = base64.b64decode(photo)
                 img = Image.open(io.BytesIO(photo_bytes))
                 img.thumbnail((60, 60))
                 
@@ -2164,12 +2190,14 @@ class MainWindow(QMainWindow):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
+            self.client.logout()
             self.client.disconnect()
             self.close()
 
 
 def main():
     """Función principal"""
+    setup_logging()
     app = QApplication(sys.argv)
 
     # Configurar estilo de la aplicación
@@ -1,28 +1,184 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 from cryptography.fernet import Fernet
+from metrics import LatencyHistogram
 
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto",
-    pbkdf2_sha256__default_rounds=30000,
-    pbkdf2_sha256__salt_size=16
-)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.ciphers import FernetCipher
+
+DEFAULT_ROUNDS = 30000
+
+def build_context(rounds: int = DEFAULT_ROUNDS) -> CryptContext:
+    """Contexto pbkdf2 con la política dada
+
+    min_rounds = max_rounds = rounds hace que needs_update marque todo hash
+    con otro costo, así un cambio de política se aplica en el siguiente login.
+    """
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+        pbkdf2_sha256__salt_size=16
+    )
+
+pwd_context = build_context()
+
+# Contextos por costo, en cada proceso (los trabajadores reciben "rounds")
+_contexts = {DEFAULT_ROUNDS: pwd_context}
+
+def get_context(rounds: int) -> CryptContext:
+    context = _contexts.get(rounds)
+    if context is None:
+        context = _contexts.setdefault(rounds, build_context(rounds))
+    return context
 
 def generate_key():
     return Fernet.generate_key()
 
+def _run_kdf(operation: str, rounds: int, *args):
+    """Corre en el proceso trabajador; retorna (resultado, segundos de cómputo)"""
+    context = get_context(rounds)
+    start = time.perf_counter()
+    if operation == "hash":
+        result = context.hash(*args)
+    elif operation == "verify_and_update":
+        # (válida, hash nuevo o None); rehashea si la política cambió
+        result = context.verify_and_update(*args)
+    else:
+        result = context.verify(*args)
+    return result, time.perf_counter() - start
+
+def _warm_up():
+    """Fuerza el arranque del proceso (e importa passlib) antes del primer login"""
+    return os.getpid()
+
+class PasswordHasher:
+    """pbkdf2 en un pool de procesos, para repartir el costo entre núcleos
+
+    workers=0 calcula en el hilo que llama (sin procesos). Los procesos se
+    crean con "spawn" porque el servidor ya tiene hilos corriendo al
+    hacer fork.
+    """
+    def __init__(self, workers: Optional[int] = None, rounds: int = DEFAULT_ROUNDS):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.pending = 0
+        self.rehashed = 0                     # Hashes actualizados al hacer login
+        self.queue_wait = LatencyHistogram()  # Envío -> inicio del cálculo (incluye IPC)
+        self.hashing = LatencyHistogram()     # Cálculo dentro del trabajador
+
+    def start(self):
+        """Crea el pool y arranca todos sus procesos"""
+        with self._lock:
+            if self._executor is not None or self.workers <= 0:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            for _ in range(self.workers):
+                self._executor.submit(_warm_up)
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, operation: str, *args) -> Future:
+        outer = Future()
+        submitted = time.perf_counter()
+        if self._executor is None:
+            self.start()
+        with self._lock:
+            executor = self._executor
+            self.pending += 1
+
+        if executor is None:
+            try:
+                self._finish(outer, submitted, _run_kdf(operation, self.rounds, *args))
+            except Exception as e:
+                self._fail(outer, e)
+            return outer
+
+        inner = executor.submit(_run_kdf, operation, self.rounds, *args)
+        def done(future: Future):
+            try:
+                self._finish(outer, submitted, future.result())
+            except BaseException as e:
+                self._fail(outer, e)
+        inner.add_done_callback(done)
+        return outer
+
+    def _finish(self, outer: Future, submitted: float, outcome):
+        result, seconds = outcome
+        total = time.perf_counter() - submitted
+        self.hashing.record(seconds)
+        self.queue_wait.record(max(0.0, total - seconds))
+        with self._lock:
+            self.pending -= 1
+        outer.set_result(result)
+
+    def _fail(self, outer: Future, error: BaseException):
+        with self._lock:
+            self.pending -= 1
+        outer.set_exception(error)
+
+    def hash_async(self, password: str) -> Future:
+        return self._submit("hash", password)
+
+    def verify_async(self, plain_password: str, hashed_password: str) -> Future:
+        return self._submit("verify", plain_password, hashed_password)
+
+    def verify_and_update_async(self, plain_password: str, hashed_password: str) -> Future:
+        return self._submit("verify_and_update", plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Procesos, cálculos en curso y latencias de cola y de cómputo"""
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "rehashed": self.rehashed,
+            "queue_wait": self.queue_wait.snapshot(),
+            "hash": self.hashing.snapshot()
+        }
+
 class AuthManager:
-    def __init__(self, key: bytes):
-        self.cipher = Fernet(key)
+    def __init__(self, key: bytes, hash_workers: Optional[int] = None, rounds: int = DEFAULT_ROUNDS):
+        # Cifrado compartido con el cliente (shared/ciphers.py), bytes a bytes
+        self.cipher = FernetCipher(key)
+        self.hasher = PasswordHasher(hash_workers, rounds)
+
+    def hash_password_async(self, password: str) -> Future:
+        return self.hasher.hash_async(password)
+
+    def verify_password_async(self, plain_password: str, hashed_password: str) -> Future:
+        return self.hasher.verify_async(plain_password, hashed_password)
 
     def hash_password(self, password: str) -> str:
-        return pwd_context.hash(password)
-    
+        # El hilo que llama solo espera; el cálculo corre en otro proceso
+        return self.hash_password_async(password).result()
+
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
-    
-    def encrypt_data(self, data: str) -> str:
-        return self.cipher.encrypt(data.encode()).decode()
-    
-    def decrypt_data(self, encrypted_data: str) -> str:
-        return self.cipher.decrypt(encrypted_data.encode()).decode()
\ No newline at end of file
+        return self.verify_password_async(plain_password, hashed_password).result()
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verifica y, si el hash no cumple la política actual, retorna uno nuevo"""
+        valid, new_hash = self.hasher.verify_and_update_async(plain_password, hashed_password).result()
+        if new_hash is not None:
+            with self.hasher._lock:
+                self.hasher.rehashed += 1
+        return valid, new_hash
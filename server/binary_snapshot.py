@@ -0,0 +1,144 @@
+# Snapshot binario de usuarios y amistades para arrancar rápido
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Mapping, Optional, Tuple
+from user_record import FIELDS, UserRecord, paused_gc
+
+# Formato (little endian):
+#   header          magic, tamaño y mtime del users.json que acompaña,
+#                   usuarios, entradas de amistad y bytes de cada sección
+#   usernames       lista JSON con el username de cada usuario (su posición
+#                   es su id)
+#   campos          lista JSON con [name, photo, password_hash] por usuario
+#   offs. campos    array('Q') de usuarios + 1: inicio de la lista de campos
+#                   de cada uno dentro de la sección anterior
+#   offs. amigos    array('Q') de usuarios + 1: inicio de los amigos de cada uno
+#   amigos          array('I') con el id de cada amigo
+# La carga completa decodifica cada sección de una vez; con los offsets se
+# puede leer un solo usuario sin recorrer el resto (ver SnapshotReader).
+MAGIC = b"STSNAP02"
+HEADER = struct.Struct("<8sQqQQQQ")
+OFFSETS = struct.Struct("<2Q")
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+def write_snapshot(path: str, users: Mapping[str, Mapping], json_stat: os.stat_result):
+    """Escribe el snapshot de forma atómica recorriendo users de a un usuario
+
+    json_stat es el del users.json escrito en la misma compactación: el
+    snapshot solo vale mientras ese archivo no cambie.
+    """
+    index = {username: position for position, username in enumerate(users)}
+    usernames = json.dumps(list(index)).encode('utf-8')
+    field_offsets = array('Q')
+    friend_offsets = array('Q', [0])
+    friends = array('I')
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(bytes(HEADER.size))  # Se completa al final
+        f.write(usernames)
+        f.write(b"[")
+        size = 1
+        for position, record in enumerate(users.values()):
+            fields = json.dumps([record[field] for field in FIELDS]).encode('utf-8')
+            if position:
+                f.write(b",")
+                size += 1
+            field_offsets.append(size)
+            f.write(fields)
+            size += len(fields)
+            friends.extend(index[friend] for friend in record["friends"] if friend in index)
+            friend_offsets.append(len(friends))
+        f.write(b"]")
+        size += 1
+        field_offsets.append(size)
+        f.write(_little_endian(field_offsets).tobytes())
+        f.write(_little_endian(friend_offsets).tobytes())
+        f.write(_little_endian(friends).tobytes())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, json_stat.st_size, json_stat.st_mtime_ns,
+                            len(index), len(friends), len(usernames), size))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class SnapshotReader:
+    """Snapshot mapeado en memoria: se carga completo o de a un usuario"""
+    def __init__(self, mapped: mmap.mmap, header: tuple):
+        _, _, _, count, entries, usernames_size, fields_size = header
+        self._mapped = mapped
+        self._fields = HEADER.size + usernames_size
+        self._field_offsets = self._fields + fields_size
+        self._friend_offsets = self._field_offsets + (count + 1) * 8
+        self._friends = self._friend_offsets + (count + 1) * 8
+        self.count = count
+        self.entries = entries
+
+    def usernames(self) -> List[str]:
+        """Usernames en orden de id, internados (son las claves de la base)"""
+        return list(map(sys.intern, json.loads(self._mapped[HEADER.size:self._fields])))
+
+    def record(self, position: int) -> UserRecord:
+        """El usuario con ese id"""
+        mapped = self._mapped
+        start, end = OFFSETS.unpack_from(mapped, self._field_offsets + position * 8)
+        # end apunta después de la coma (o del "]") que cierra los campos
+        name, photo, password_hash = json.loads(mapped[self._fields + start:self._fields + end - 1])
+        start, end = OFFSETS.unpack_from(mapped, self._friend_offsets + position * 8)
+        friends = _little_endian(array('I', mapped[self._friends + start * 4:self._friends + end * 4]))
+        return UserRecord(position, name, photo, password_hash, friends)
+
+    def load_all(self) -> Tuple[List[str], Dict[str, UserRecord]]:
+        """Todos los usuarios: (usernames por id, {username: registro})"""
+        mapped = self._mapped
+        usernames = self.usernames()
+        fields = json.loads(mapped[self._fields:self._field_offsets])
+        offsets = _little_endian(array('Q', mapped[self._friend_offsets:self._friends])).tolist()
+        friends = _little_endian(array('I', mapped[self._friends:]))
+        with paused_gc():
+            users = dict(zip(usernames, (
+                UserRecord(position, name, photo, password_hash, friends[start:end])
+                for position, ((name, photo, password_hash), start, end)
+                in enumerate(zip(fields, offsets, offsets[1:]))
+            )))
+        return usernames, users
+
+    def close(self):
+        self._mapped.close()
+
+def open_snapshot(path: str, json_path: str) -> Optional[SnapshotReader]:
+    """Abre el snapshot si existe, está completo y corresponde al users.json actual"""
+    if not os.path.exists(path) or not os.path.exists(json_path):
+        return None
+    json_stat = os.stat(json_path)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            return None
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = HEADER.unpack_from(mapped)
+    magic, json_size, json_mtime_ns, count, entries, usernames_size, fields_size = header
+    expected = HEADER.size + usernames_size + fields_size + (count + 1) * 16 + entries * 4
+    if (magic != MAGIC or (json_size, json_mtime_ns) != (json_stat.st_size, json_stat.st_mtime_ns)
+            or size != expected):
+        mapped.close()
+        return None  # De otro users.json, de otro formato o cortado
+    return SnapshotReader(mapped, header)
+
+def read_snapshot(path: str, json_path: str) -> Optional[Tuple[List[str], Dict[str, UserRecord]]]:
+    """Lo mismo que SnapshotReader.load_all, o None si falta o no vale"""
+    reader = open_snapshot(path, json_path)
+    if reader is None:
+        return None
+    try:
+        return reader.load_all()
+    finally:
+        reader.close()
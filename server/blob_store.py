@@ -0,0 +1,94 @@
+# Fotos de perfil direccionadas por contenido, fuera de la base de usuarios
+import base64
+import binascii
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Optional
+
+# Id de un blob: sha256 del contenido en hexadecimal
+BLOB_ID = re.compile(r"[0-9a-f]{64}")
+
+def is_blob_id(value) -> bool:
+    return isinstance(value, str) and BLOB_ID.fullmatch(value) is not None
+
+class BlobStore:
+    """Blobs en disco con nombre = sha256 del contenido (photos/ab/abcd...)
+
+    El mismo contenido se guarda una sola vez; como un blob nunca cambia,
+    su id sirve de ETag. Los registros de usuario guardan solo el id.
+    Con use_mmap las lecturas mapean el archivo en vez de copiarlo a un
+    bytes intermedio antes de codificarlo.
+    """
+    def __init__(self, root: str = "photos", use_mmap: bool = False):
+        # Ruta absoluta: no depende del cwd del servidor
+        self.root = os.path.abspath(root)
+        self.use_mmap = use_mmap
+        self._lock = threading.Lock()
+        self._stats = {"stored": 0, "deduplicated": 0, "reads": 0, "missing": 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, blob_id: str) -> str:
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def put(self, data: bytes) -> str:
+        """Guarda el contenido (si no existe ya) y retorna su id"""
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            self._count("deduplicated")
+            return blob_id
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Archivo temporal + rename: un lector nunca ve un blob a medias
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._count("stored")
+        return blob_id
+
+    def put_base64(self, encoded: str) -> str:
+        """Guarda una foto en base64 (como la envía el cliente); "" no tiene foto"""
+        if not encoded:
+            return ""
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("Foto inválida: no es base64")
+        return self.put(data)
+
+    def exists(self, blob_id: str) -> bool:
+        return is_blob_id(blob_id) and os.path.exists(self._path(blob_id))
+
+    def read_base64(self, blob_id: str) -> Optional[str]:
+        """Contenido del blob en base64, o None si no existe"""
+        if not is_blob_id(blob_id):
+            return None
+        try:
+            with open(self._path(blob_id), 'rb') as f:
+                if self.use_mmap and os.fstat(f.fileno()).st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        encoded = base64.b64encode(mapped)
+                else:
+                    encoded = base64.b64encode(f.read())
+        except FileNotFoundError:
+            self._count("missing")
+            return None
+        self._count("reads")
+        return encoded.decode('ascii')
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"root": self.root, "mmap": self.use_mmap, **self._stats}
@@ -0,0 +1,68 @@
+"""
+Calibra el costo de pbkdf2 para este equipo: mide cuánto tarda un hash y
+elige el número de rondas que cumple el presupuesto de latencia pedido.
+La política se guarda en server_config.json; el servidor la usa al
+arrancar y rehashea cada contraseña con otro costo en su siguiente login.
+
+Uso: python calibrate_kdf.py --target-ms 250 [--config server_config.json] [--dry-run]
+"""
+import argparse
+import statistics
+import time
+from auth import build_context
+from config import CONFIG_FILE, load_config, save_config
+
+PROBE_ROUNDS = 10000
+MIN_ROUNDS = 10000    # Piso de seguridad aunque el equipo sea lento
+ROUND_TO = 1000
+SAMPLES = 7
+
+def measure(rounds: int, samples: int = SAMPLES) -> float:
+    """Mediana en segundos de un hash con el costo dado"""
+    context = build_context(rounds)
+    context.hash("calibracion")  # Calentamiento
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibracion")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def calibrate(target_ms: float, passes: int = 2) -> int:
+    """Rondas que tardan ~target_ms en este equipo
+
+    El costo es lineal en las rondas; se estima con una prueba corta y se
+    corrige midiendo de nuevo con la estimación (la prueba corta sobrestima
+    el costo por ronda).
+    """
+    rounds = PROBE_ROUNDS
+    for _ in range(passes):
+        per_round = measure(rounds) / rounds
+        rounds = max(MIN_ROUNDS, round(target_ms / 1000 / per_round / ROUND_TO) * ROUND_TO)
+    return rounds
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibración de pbkdf2")
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="Latencia objetivo de un hash en milisegundos")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Solo mostrar el resultado, sin guardar")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    current = config["kdf"]["rounds"]
+    rounds = calibrate(args.target_ms)
+    measured_ms = measure(rounds) * 1000
+
+    print(f"Rondas actuales: {current} ({measure(current) * 1000:.1f} ms)")
+    print(f"Rondas elegidas: {rounds} ({measured_ms:.1f} ms, objetivo {args.target_ms:.0f} ms)")
+    if args.dry_run:
+        return
+
+    config["kdf"].update({"rounds": rounds, "target_ms": args.target_ms})
+    save_config(config, args.config)
+    print(f"Política guardada en {args.config}")
+
+if __name__ == '__main__':
+    main()
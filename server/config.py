@@ -0,0 +1,55 @@
+# Configuración persistente del servidor (server_config.json)
+import copy
+import json
+import os
+from typing import Dict
+
+CONFIG_FILE = "server_config.json"
+
+DEFAULT_CONFIG = {
+    # Política de hashing de contraseñas; la escribe calibrate_kdf.py
+    "kdf": {
+        "scheme": "pbkdf2_sha256",
+        "rounds": 30000,
+        "target_ms": None
+    },
+    # Backend de usuarios: "json" o "sqlite" (ver migrate_to_sqlite.py)
+    "storage": {
+        "backend": "json",
+        "json_path": "users.json",
+        "json_fsync": False,         # fsync del log en cada escritura
+        "durability": "immediate",   # immediate, group o interval (ver database.py)
+        "flush_interval_ms": 50.0,   # Espera máxima del escritor (modo interval)
+        "flush_max_mutations": 256,  # Mutaciones que disparan esa escritura antes
+        "compact_threshold": 10000,  # Entradas del log antes de compactar
+        "compact_interval": 300.0,   # Segundos entre compactaciones periódicas
+        "binary_snapshot": True,     # users.json.snap para arrancar rápido
+        "lazy_load": False,          # Usuarios a pedido desde el snapshot (ver lazy_database.py)
+        "cache_size": 10000,         # Usuarios en la caché LRU de lazy_load
+        "shards": 1,                 # Archivos users.NNN-of-MMM.json (ver shards.py y reshard.py);
+                                     # con más de uno no hay .snap ni lazy_load
+        "sqlite_path": "users.db",
+        "photos_dir": "photos",      # Fotos de perfil por hash (ver blob_store.py)
+        "photos_mmap": False         # Leer las fotos con mmap
+    }
+}
+
+def load_config(path: str = CONFIG_FILE) -> Dict:
+    """Lee la configuración; las claves ausentes toman su valor por defecto"""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            stored = json.load(f)
+        for section, values in stored.items():
+            if isinstance(values, dict) and isinstance(config.get(section), dict):
+                config[section].update(values)
+            else:
+                config[section] = values
+    return config
+
+def save_config(config: Dict, path: str = CONFIG_FILE):
+    """Guarda la configuración con reemplazo atómico del archivo"""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(temp_path, path)
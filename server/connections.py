@@ -0,0 +1,152 @@
+# Estado por conexión de cliente y registro de conexiones activas
+import asyncio
+import itertools
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.serialization import DEFAULT_CODEC
+from shared.logs import get_logger
+
+log = get_logger("server.connections")
+
+# Respuesta enviada antes de cerrar cuando se alcanza el máximo de conexiones
+FULL_RESPONSE = {
+    "status": "busy",
+    "message": "Servidor lleno, intenta más tarde",
+    "retry_after": 2.0
+}
+
+_connection_ids = itertools.count(1)
+
+def set_send_timeout(sock: socket.socket, seconds: float):
+    """Límite para cada envío bloqueante (SO_SNDTIMEO), sin afectar a recv
+
+    Un cliente que no lee sus respuestas llena el buffer del socket; sin
+    límite, el trabajador que envía quedaría bloqueado para siempre.
+    """
+    if not seconds:
+        return
+    if sys.platform == "win32":
+        value = struct.pack("<I", int(seconds * 1000))
+    else:
+        value = struct.pack("ll", int(seconds), int(seconds % 1 * 1_000_000))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, value)
+
+class ClientConnection:
+    """Transporte, lock de envío y opciones negociadas de un cliente"""
+    def __init__(self, address, cipher, sock=None, writer: Optional[asyncio.StreamWriter] = None):
+        self.id = next(_connection_ids)
+        self.address = address
+        self.sock = sock          # Motor thread
+        self.writer = writer      # Motor async
+        self.loop = asyncio.get_running_loop() if writer is not None else None
+        self.send_lock = asyncio.Lock() if writer is not None else threading.Lock()
+        self.frames_received = 0
+        self.connected_at = time.monotonic()
+        self.last_activity = self.connected_at
+
+        # Opciones negociadas (acción "negotiate")
+        self.compression: Optional[str] = None
+        self.codec = DEFAULT_CODEC
+        self.cipher = cipher      # Fernet compartido o sesión AES-GCM propia
+
+    def touch(self):
+        """Marca actividad (frame recibido o respuesta enviada)"""
+        self.last_activity = time.monotonic()
+
+    def idle_seconds(self, now: float = None) -> float:
+        return (now if now is not None else time.monotonic()) - self.last_activity
+
+    def close(self):
+        """Cierra el transporte desde cualquier hilo; el handler termina solo"""
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.writer.close)
+            return
+        try:
+            # shutdown despierta al hilo bloqueado en recv
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+class ConnectionRegistry:
+    """Conexiones activas con alta/baja O(1), tope máximo y cierre por inactividad"""
+    def __init__(self, max_connections: int = 1000, idle_timeout: float = 300.0):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self._connections: Dict[int, ClientConnection] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper = None
+
+        # Métricas
+        self.accepted = 0
+        self.refused = 0
+        self.reaped = 0
+
+    def register(self, conn: ClientConnection) -> bool:
+        """Agrega la conexión; False si ya se alcanzó el máximo"""
+        with self._lock:
+            if len(self._connections) >= self.max_connections:
+                self.refused += 1
+                return False
+            self._connections[conn.id] = conn
+            self.accepted += 1
+            return True
+
+    def unregister(self, conn: ClientConnection):
+        with self._lock:
+            self._connections.pop(conn.id, None)
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def snapshot(self) -> List[ClientConnection]:
+        """Copia de las conexiones activas, para recorrer sin el lock"""
+        with self._lock:
+            return list(self._connections.values())
+
+    def reap_idle(self) -> int:
+        """Cierra las conexiones inactivas por más de idle_timeout"""
+        now = time.monotonic()
+        idle = [conn for conn in self.snapshot() if conn.idle_seconds(now) > self.idle_timeout]
+        for conn in idle:
+            log.info("Cerrando conexión inactiva: %s", conn.address)
+            conn.close()
+        with self._lock:
+            self.reaped += len(idle)
+        return len(idle)
+
+    def start_reaper(self):
+        """Hilo de fondo que revisa periódicamente las conexiones inactivas"""
+        if not self.idle_timeout or self._reaper is not None:
+            return
+        self._stop.clear()
+        self._reaper = threading.Thread(target=self._reaper_loop, name="socialtec-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self):
+        self._stop.set()
+        self._reaper = None
+
+    def _reaper_loop(self):
+        interval = max(1.0, min(self.idle_timeout / 4, 30.0))
+        while not self._stop.wait(interval):
+            self.reap_idle()
+
+    def stats(self) -> dict:
+        """Conexiones vivas y contadores para la ventana del servidor"""
+        with self._lock:
+            return {
+                "active": len(self._connections),
+                "max": self.max_connections,
+                "accepted": self.accepted,
+                "refused": self.refused,
+                "reaped": self.reaped,
+                "idle_timeout": self.idle_timeout
+            }
@@ -1,56 +1,585 @@
 # JSON/SQLITE para usuarios y relaciones
 import json
 import os
-from typing import Dict, Optional
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from array import array
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+from sqlite_database import SqliteUserDataBase, USER_FIELDS
+from metrics import LatencyHistogram
+from rwlock import RWLock
+from binary_snapshot import read_snapshot, write_snapshot
+from shards import MAX_SHARDS, find_layouts, read_shards, shard_of, shard_paths, write_shards
+from user_record import RecordsView, UserRecord, paused_gc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.logs import get_logger
+
+log = get_logger("server.database")
+
+# Sufijos del log de mutaciones junto al snapshot (users.json)
+LOG_SUFFIX = ".log"
+COMPACTING_SUFFIX = ".log.compacting"
+# Snapshot binario que se escribe junto a cada users.json (ver binary_snapshot.py)
+BINARY_SUFFIX = ".snap"
+
+# Cuándo llega cada mutación al log:
+#   immediate: se escribe antes de retornar
+#   group:     cada llamada espera a que su mutación esté escrita; el primer
+#              hilo que encuentra el log libre escribe las pendientes de todos
+#              (líder) y las que llegan mientras escribe (y hace fsync) salen
+#              juntas en la siguiente escritura
+#   interval:  write-behind: no se espera; el escritor junta mutaciones hasta
+#              flush_interval_ms o flush_max_mutations. Un crash puede perder
+#              las de la última ventana
+DURABILITY_MODES = ("immediate", "group", "interval")
 
 class UserDataBase:
-    def __init__(self, db_file: str = "users.json"):
-        self.db_file = db_file
+    """Backend JSON: snapshot + log de mutaciones de solo agregar
+
+    Cada cambio se aplica en memoria y se agrega como una línea JSON al log
+    (O(1), con fsync opcional). Un hilo compactador vuelca el estado a un
+    snapshot nuevo cuando el log crece; al arrancar se lee el snapshot y se
+    reaplica el log. Las operaciones del log son idempotentes, así que
+    reaplicar entradas ya incluidas en el snapshot no cambia el resultado.
+
+    En memoria cada usuario es un UserRecord (con __slots__) y sus amigos
+    son ids: posiciones en self.names, la tabla de usernames internados.
+    Los ids no cambian porque los usuarios no se borran. Hacia afuera
+    (get_user, users, el JSON) los amigos siguen siendo usernames.
+
+    Las lecturas comparten un RWLock y las mutaciones lo toman como
+    escritor. Los recorridos completos (users) usan una vista inmutable
+    que se rehace solo cuando hubo cambios, así que no frenan a los escritores.
+
+    Con shards > 1 el snapshot se reparte en varios archivos según el hash
+    del username (ver shards.py): se leen en paralelo al arrancar y cada
+    compactación reescribe solo los shards con usuarios que cambiaron.
+    """
+    def __init__(self, db_file: str = "users.json", fsync: bool = False,
+                 compact_threshold: int = 10000, compact_interval: float = 300.0,
+                 durability: str = "immediate", flush_interval_ms: float = 50.0,
+                 flush_max_mutations: int = 256, binary_snapshot: bool = True, shards: int = 1):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Modo de durabilidad desconocido: {durability}")
+        if not 1 <= shards <= MAX_SHARDS:
+            raise ValueError(f"Cantidad de shards inválida: {shards}")
+        # Ruta absoluta: el log y los snapshots no dependen del cwd
+        self.db_file = os.path.abspath(db_file)
+        self.log_file = self.db_file + LOG_SUFFIX
+        self.shards = shards
+        # El snapshot binario acompaña a un único users.json
+        self.binary_file = self.db_file + BINARY_SUFFIX if binary_snapshot and shards == 1 else None
+        self._dirty_shards = set()  # Shards con cambios que aún no están en disco
+        self.fsync = fsync
+        self.compact_threshold = compact_threshold
+        self.durability = durability
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_mutations = flush_max_mutations
+        self._rwlock = RWLock()
+        self._lock = self._rwlock.writer       # Mutaciones, de a una
+        # Cola de líneas pendientes y avisos entre escritores y el flusher; es
+        # aparte del RWLock para que escribir el log no frene a los lectores
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()       # Escrituras al log, en orden
+        self._compact_lock = threading.Lock()  # Una compactación a la vez
+
+        # Líneas aún no escritas (batch abierto o esperando al flusher). El
+        # batch es de cada hilo: solo difiere la espera del hilo que lo abrió
+        self._batch = threading.local()  # depth y última secuencia del hilo
+        self._pending = []
+        self._first_pending_at = 0.0
+        self._appended = 0       # Secuencia de la última mutación aceptada
+        self._flushed = 0        # Secuencia de la última mutación escrita
+        self._flushing = False   # Hay un líder de group escribiendo
+
+        # Vista inmutable para recorridos: se rehace cuando cambia la versión y
+        # comparte los registros; un registro con epoch <= _view_epoch puede
+        # estar en una vista, así que se copia antes de cambiarlo
+        self._version = 0
+        self._view = None   # (versión, vista)
+        self._view_epoch = -1
+        self._view_lock = threading.Lock()
+
+        # Métricas
+        self.log_entries = 0
+        self.compactions = 0
+        self.last_compaction_ms = 0.0
+        self.flushes = 0
+        self.flushed_mutations = 0
+        self.max_mutations_per_flush = 0
+        self.flush_times = LatencyHistogram()
+        self.shards_written = 0
+        self.load_times = {}     # Segundos de cada fase del arranque
+        self.loaded_from = None  # "binary" o "json"
+        self._binary_stale = False  # Falta el snapshot binario o no corresponde al JSON
+
+        start = time.perf_counter()
         self.data = self._load_data()
+        self.load_times["snapshot"] = time.perf_counter() - start
+        start = time.perf_counter()
+        replayed = self._replay(self.db_file + COMPACTING_SUFFIX) + self._replay(self.log_file)
+        self.load_times["replay"] = time.perf_counter() - start
+        self._log = open(self.log_file, 'a', encoding='utf-8')
+        if replayed:
+            # Deja el log vacío (y descarta una última línea cortada por un crash)
+            start = time.perf_counter()
+            self.compact()
+            self.load_times["compact"] = time.perf_counter() - start
+
+        self._stop = threading.Event()
+        self._flusher = None
+        if durability == "interval":
+            self._flusher = threading.Thread(target=self._flusher_loop, name="socialtec-flusher", daemon=True)
+            self._flusher.start()
+        self._compactor = None
+        if compact_interval:
+            self._compactor = threading.Thread(target=self._compactor_loop, args=(compact_interval,),
+                                               name="socialtec-compactor", daemon=True)
+            self._compactor.start()
+        if self._binary_stale and not replayed:
+            # Primer arranque sin snapshot binario (o desactualizado): se escribe en segundo plano
+            self._start_compaction()
 
     def _load_data(self) -> Dict:
-        if os.path.exists(self.db_file):
-            with open(self.db_file, 'r') as f:
-                return json.load(f)
-        return {"users": {}}
-    
-    def _save_data(self):
-        with open(self.db_file, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Lee el snapshot binario si corresponde al users.json actual; si no, el JSON"""
+        if self.binary_file:
+            loaded = read_snapshot(self.binary_file, self.db_file)
+            if loaded is not None:
+                self.names, users = loaded
+                self.loaded_from = "binary"
+                return {"users": users}
+        self.names = []
+        stored = self._read_shards()
+        if stored is None:
+            return {"users": {}}
+        self.names = list(map(sys.intern, stored))
+        ids = {username: user_id for user_id, username in enumerate(self.names)}
+        users = {}
+        with paused_gc():
+            for user_id, (username, user_data) in enumerate(zip(self.names, stored.values())):
+                friends = user_data.get("friends", ())
+                try:
+                    friend_ids = array('I', map(ids.__getitem__, friends))
+                except KeyError:
+                    # Amigos que no existen: no tienen id y se descartan
+                    friend_ids = array('I', [ids[friend] for friend in friends if friend in ids])
+                users[username] = UserRecord(user_id, user_data["name"], user_data.get("photo", ""),
+                                             user_data["password_hash"], friend_ids)
+        self.loaded_from = "json"
+        self._binary_stale = self.binary_file is not None
+        return {"users": users}
 
-    def add_user(self, username: str, password_hash: str, name: str, photo: str = ""):
-        if username in self.data["users"]:
+    def _read_shards(self) -> Optional[Dict]:
+        """Usuarios de todos los shards, o None si la base es nueva"""
+        paths = shard_paths(self.db_file, self.shards)
+        missing = [path for path in paths if not os.path.exists(path)]
+        if not missing:
+            return read_shards(paths)
+        layouts = find_layouts(self.db_file)
+        if len(missing) < len(paths) or layouts:
+            # No se arranca con otra distribución: los usuarios de los demás archivos no se verían
+            found = ", ".join(map(str, layouts)) if layouts else "ninguna completa"
+            raise ValueError(f"{self.db_file} no está repartido en {self.shards} shard(s) "
+                             f"(en disco: {found}); usar reshard.py")
+        # Base nueva: la primera compactación escribe todos los archivos
+        self._dirty_shards.update(range(self.shards))
+        return None
+
+    def _replay(self, path: str) -> int:
+        """Reaplica las entradas de un log; retorna cuántas se aplicaron"""
+        if not os.path.exists(path):
+            return 0
+        applied = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    log.warning("Entrada inválida en %s:%d (escritura interrumpida), se descarta",
+                                path, line_number)
+                    continue
+                self._apply(entry)
+                applied += 1
+        return applied
+
+    def _apply(self, entry: Dict) -> bool:
+        """Aplica una mutación al estado en memoria (idempotente)"""
+        users = self.data["users"]
+        op = entry["op"]
+        if op == "add_user":
+            if entry["username"] in users:
+                return False
+            username = sys.intern(entry["username"])
+            self._version += 1
+            users[username] = UserRecord(len(self.names), entry["name"], entry["photo"],
+                                         entry["password_hash"], epoch=self._version)
+            self.names.append(username)
+            self._touch(username)
+            return True
+        if op == "update_user":
+            if entry["username"] not in users:
+                return False
+            self._version += 1
+            record = self._writable(entry["username"])
+            for field, value in entry["fields"].items():
+                setattr(record, field, value)
+            self._touch(entry["username"])
+            return True
+
+        user1, user2 = entry["user1"], entry["user2"]
+        if user1 not in users or user2 not in users:
             return False
-        self.data["users"][username] = {
-            "name": name,
-            "photo": photo,
-            "password_hash": password_hash,
-            "friends": []
-        }
-        self._save_data()
+        self._version += 1
+        record1, record2 = self._writable(user1), self._writable(user2)
+        if op == "add_friend":
+            record1.add_friend(record2.id)
+            record2.add_friend(record1.id)
+        elif op == "remove_friend":
+            record1.remove_friend(record2.id)
+            record2.remove_friend(record1.id)
+        self._touch(user1, user2)
         return True
-    
+
+    def _touch(self, *usernames: str):
+        """Marca los shards de esos usuarios para la próxima compactación"""
+        if self.shards > 1:
+            self._dirty_shards.update(shard_of(username, self.shards) for username in usernames)
+
+    def _writable(self, username: str) -> UserRecord:
+        """Registro que se puede cambiar en el lugar (como escritor, con la versión ya aumentada)
+
+        Si una vista puede tenerlo se reemplaza por una copia. Se vuelve a
+        asignar siempre: con carga a pedido eso lo fija en memoria.
+        """
+        users = self.data["users"]
+        record = users[username]
+        if record.epoch <= self._view_epoch:
+            record = record.copy(self._version)
+        users[username] = record
+        return record
+
+    def _mutate(self, entry: Dict) -> bool:
+        """Aplica la mutación y la agrega al log (o al batch abierto)"""
+        with self._lock:
+            if not self._apply(entry):
+                return False
+            # Se encola con el lock de escritura tomado: el log sigue el orden de aplicación
+            with self._cond:
+                if not self._pending:
+                    self._first_pending_at = time.monotonic()
+                self._pending.append(json.dumps(entry) + "\n")
+                self._appended += 1
+                sequence = self._appended
+                compact = self.log_entries >= self.compact_threshold
+        if getattr(self._batch, "depth", 0):
+            self._batch.sequence = sequence
+        else:
+            self._commit(sequence)
+        if compact:
+            self._start_compaction()
+        return True
+
+    def _commit(self, sequence: int):
+        """Lleva las mutaciones hasta sequence al log según el modo (sin el lock de escritura)"""
+        if self.durability == "immediate":
+            self._flush_log()
+        with self._cond:
+            if self.durability == "interval":
+                self._cond.notify_all()  # El flusher decide cuándo escribir
+                return
+            while self._flushed < sequence and not self._stop.is_set():
+                if self._flushing or not self._pending:
+                    # Otro hilo ya tomó la línea de este o la tomará en su próxima escritura
+                    self._cond.wait()
+                    continue
+                # Líder de group: una escritura para todas las pendientes
+                self._flushing = True
+                lines, taken = self._take_pending()
+                self._cond.release()
+                try:
+                    seconds = self._write_lines(lines)
+                finally:
+                    self._io_lock.release()
+                    self._cond.acquire()
+                    self._flushing = False
+                self._record_flush(len(lines), taken, seconds)
+
+    def _take_pending(self):
+        """Saca las líneas pendientes y toma el lock de escritura del log (con _cond tomado)
+
+        El lock del log se adquiere antes de soltar _cond para que las
+        líneas lleguen al log en el mismo orden en que se encolaron.
+        """
+        lines, self._pending = self._pending, []
+        self._io_lock.acquire()
+        return lines, self._appended
+
+    def _write_lines(self, lines) -> float:
+        """Una escritura (y un fsync) para todas las líneas; retorna la duración"""
+        start = time.perf_counter()
+        self._log.write("".join(lines))
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        return time.perf_counter() - start
+
+    def _record_flush(self, count: int, sequence: int, seconds: float):
+        """Actualiza contadores y despierta a quienes esperan (con _cond tomado)"""
+        self._flushed = max(self._flushed, sequence)
+        self.log_entries += count
+        self.flushes += 1
+        self.flushed_mutations += count
+        self.max_mutations_per_flush = max(self.max_mutations_per_flush, count)
+        self.flush_times.record(seconds)
+        self._cond.notify_all()
+
+    def _flush_log(self):
+        """Escribe ya las líneas pendientes"""
+        with self._cond:
+            if not self._pending:
+                return
+            lines, sequence = self._take_pending()
+        try:
+            seconds = self._write_lines(lines)
+        finally:
+            self._io_lock.release()
+        with self._cond:
+            self._record_flush(len(lines), sequence, seconds)
+
+    def _flusher_loop(self):
+        """Escritor de fondo del modo interval"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop.is_set():
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Se deja juntar mutaciones hasta el intervalo o el máximo
+                deadline = self._first_pending_at + self.flush_interval
+                while (len(self._pending) < self.flush_max_mutations and not self._stop.is_set()
+                       and time.monotonic() < deadline):
+                    self._cond.wait(deadline - time.monotonic())
+                lines, sequence = self._take_pending()
+            # La escritura ocurre sin _cond: se siguen encolando mutaciones
+            try:
+                seconds = self._write_lines(lines)
+            finally:
+                self._io_lock.release()
+            with self._cond:
+                self._record_flush(len(lines), sequence, seconds)
+
+    @contextmanager
+    def batch(self):
+        """Agrupa varias mutaciones de este hilo en una sola escritura (y un fsync) del log
+
+        Las líneas del batch se encolan en orden con las de los demás hilos;
+        si otro hilo escribe el log antes del cierre, las lleva con las suyas.
+        """
+        batch = self._batch
+        if not getattr(batch, "depth", 0):
+            batch.depth = 0
+            batch.sequence = 0
+        batch.depth += 1
+        try:
+            yield self
+        finally:
+            batch.depth -= 1
+            if batch.depth == 0 and self._flushed < batch.sequence:
+                self._commit(batch.sequence)
+
+    def compact(self):
+        """Vuelca el estado a un snapshot nuevo y reinicia el log
+
+        El log actual se renombra antes de escribir el snapshot; si el
+        proceso muere a mitad, el arranque reaplica ese log y no se pierde nada.
+        """
+        with self._compact_lock:
+            start = time.perf_counter()
+            with self._lock:
+                self._flush_log()
+                with self._io_lock:
+                    self._log.close()
+                    self._rotate_log()
+                    self._log = open(self.log_file, 'a', encoding='utf-8')
+                self.log_entries = 0
+                # Vista inmutable del estado a esta altura del log; se serializa fuera del lock
+                view = self._compaction_view()
+                dirty_shards, self._dirty_shards = self._dirty_shards, set()
+            try:
+                self._write_json(view, dirty_shards)
+            except BaseException:
+                # Se vuelven a escribir en el próximo intento
+                with self._lock:
+                    self._dirty_shards |= dirty_shards
+                raise
+            if self.binary_file:
+                write_snapshot(self.binary_file, view, os.stat(self.db_file))
+                self._binary_stale = False
+            self._compacted(view)
+            os.remove(self.db_file + COMPACTING_SUFFIX)
+
+            self.compactions += 1
+            if self.shards > 1:
+                self.shards_written += len(dirty_shards)
+            self.last_compaction_ms = (time.perf_counter() - start) * 1000
+            log.info("Log compactado en %s (%.0f ms)", self.db_file, self.last_compaction_ms)
+
+    def _rotate_log(self):
+        """Pasa el log a .log.compacting (con _io_lock y el log cerrado)
+
+        Si quedó el de una compactación que falló, sus entradas no están en
+        ningún snapshot: el log actual se agrega al final en vez de pisarlo.
+        """
+        compacting_file = self.db_file + COMPACTING_SUFFIX
+        if not os.path.exists(compacting_file):
+            os.replace(self.log_file, compacting_file)
+            return
+        with open(compacting_file, 'rb+') as compacting, open(self.log_file, 'rb') as current:
+            compacting.seek(0, os.SEEK_END)
+            if compacting.tell():
+                compacting.seek(-1, os.SEEK_END)
+                if compacting.read(1) != b"\n":
+                    compacting.write(b"\n")  # Última línea cortada: se descarta al reaplicar
+            shutil.copyfileobj(current, compacting)
+            compacting.flush()
+            os.fsync(compacting.fileno())
+        # Si el proceso muere aquí las entradas quedan repetidas; reaplicarlas no cambia nada
+        os.remove(self.log_file)
+
+    def _compaction_view(self) -> Mapping[str, Mapping]:
+        """Estado que vuelca compact (se llama con el lock de escritura)"""
+        return self.view()
+
+    def _compacted(self, view: Mapping[str, Mapping]):
+        """Se llama cuando view ya está en disco"""
+
+    def _write_json(self, users: Mapping[str, Mapping], shards=None):
+        """Escribe users.json (o los shards indicados; todos si es None) de a un usuario"""
+        write_shards(self.db_file, self.shards, users, None if self.shards == 1 else shards)
+
+    def _start_compaction(self):
+        """Compacta en segundo plano sin detener al hilo que escribió"""
+        if not self._compact_lock.locked():
+            threading.Thread(target=self.compact, name="socialtec-compact", daemon=True).start()
+
+    def _compactor_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            if self.log_entries:
+                self.compact()
+
+    def add_user(self, username: str, password_hash: str, name: str, photo: str = ""):
+        return self._mutate({"op": "add_user", "username": username, "name": name,
+                             "photo": photo, "password_hash": password_hash})
+
     def get_user(self, username: str) -> Optional[Dict]:
-        return self.data["users"].get(username)
-    
+        """Copia de los datos del usuario (amigos como lista); los cambios se hacen con update_user"""
+        with self._rwlock.reader:
+            record = self.data["users"].get(username)
+            if record is None:
+                return None
+            return record.to_dict(self.names)
+
+    def get_users(self, usernames) -> Dict[str, Dict]:
+        """Copias de varios usuarios en una sola pasada (los que no existen se omiten)"""
+        with self._rwlock.reader:
+            names = self.names
+            return {username: record.to_dict(names) for username, record in self._fetch(usernames).items()}
+
+    def _fetch(self, usernames) -> Dict[str, UserRecord]:
+        """Registros en memoria de esos usuarios (con el lock de lectura)"""
+        users = self.data["users"]
+        return {username: users[username] for username in usernames if username in users}
+
+    def update_user(self, username: str, **fields) -> bool:
+        """Cambia nombre, foto o hash de contraseña y lo registra en el log"""
+        changes = {field: fields[field] for field in USER_FIELDS if field in fields}
+        if not changes:
+            return username in self.data["users"]
+        return self._mutate({"op": "update_user", "username": username, "fields": changes})
+
+    def view(self) -> Mapping[str, Mapping]:
+        """Vista inmutable y consistente de todos los usuarios (amigos como tupla)"""
+        with self._rwlock.reader:
+            with self._view_lock:
+                if self._view is not None and self._view[0] == self._version:
+                    return self._view[1]
+                # Copia de las referencias; desde aquí los cambios copian el registro
+                self._view_epoch = self._version
+                view = RecordsView(dict(self.data["users"]), self.names)
+                self._view = (self._version, view)
+                return view
+
+    def users(self) -> Iterator[Tuple[str, Mapping]]:
+        """Recorre (username, datos) de todos los usuarios sobre la vista inmutable"""
+        return iter(self.view().items())
+
+    def __len__(self) -> int:
+        return len(self.data["users"])
+
     def add_friend(self, user1: str, user2: str):
-        if user1 in self.data["users"] and user2 in self.data["users"]:
-            if user2 not in self.data["users"][user1]["friends"]:
-                self.data["users"][user1]["friends"].append(user2)
-            
-            if user1 not in self.data["users"][user2]["friends"]:
-                self.data["users"][user2]["friends"].append(user1)
-            self._save_data()
-            return True
-        
-        return False
-    
+        return self._mutate({"op": "add_friend", "user1": user1, "user2": user2})
+
     def remove_friend(self, user1: str, user2: str):
-        if user1 in self.data["users"] and user2 in self.data["users"]:
-            if user2 in self.data["users"][user1]["friends"]:
-                self.data["users"][user1]["friends"].remove(user2)
-            if user1 in self.data["users"][user2]["friends"]:
-                self.data["users"][user2]["friends"].remove(user1)
-            self._save_data()
-            return True
-        return False
\ No newline at end of file
+        return self._mutate({"op": "remove_friend", "user1": user1, "user2": user2})
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "json",
+            "users": len(self),
+            "log_entries": self.log_entries,
+            "compactions": self.compactions,
+            "last_compaction_ms": self.last_compaction_ms,
+            "fsync": self.fsync,
+            "durability": self.durability,
+            "flushes": self.flushes,
+            "mutations_per_flush": self.flushed_mutations / self.flushes if self.flushes else 0.0,
+            "max_mutations_per_flush": self.max_mutations_per_flush,
+            "flush": self.flush_times.snapshot(),
+            "loaded_from": self.loaded_from,
+            "load_times": self.load_times,
+            "shards": self.shards,
+            "shards_written": self.shards_written,
+            "lock": self._rwlock.stats()
+        }
+
+    def close(self):
+        """Detiene los hilos de fondo y deja todo en el snapshot"""
+        with self._cond:
+            self._stop.set()
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.compact()
+        with self._lock:
+            self._log.close()
+
+def open_database(storage: Dict):
+    """Crea el backend indicado en la sección "storage" de la configuración"""
+    backend = storage.get("backend", "json")
+    if backend == "json":
+        options = {}
+        database_class = UserDataBase
+        if storage.get("lazy_load", False):
+            # Importado aquí: lazy_database importa este módulo
+            from lazy_database import LazyUserDataBase
+            database_class = LazyUserDataBase
+            options["cache_size"] = storage.get("cache_size", 10000)
+        return database_class(
+            storage.get("json_path", "users.json"),
+            **options,
+            fsync=storage.get("json_fsync", False),
+            compact_threshold=storage.get("compact_threshold", 10000),
+            compact_interval=storage.get("compact_interval", 300.0),
+            durability=storage.get("durability", "immediate"),
+            flush_interval_ms=storage.get("flush_interval_ms", 50.0),
+            flush_max_mutations=storage.get("flush_max_mutations", 256),
+            binary_snapshot=storage.get("binary_snapshot", True),
+            shards=storage.get("shards", 1)
+        )
+    if backend == "sqlite":
+        return SqliteUserDataBase(storage.get("sqlite_path", "users.db"))
+    raise ValueError(f"Backend de almacenamiento desconocido: {backend}")
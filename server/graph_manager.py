@@ -2,51 +2,90 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 from typing import List, Optional
+from rwlock import RWLock
 
 class SocialGraph:
+    """Grafo de amistades; las consultas leen en paralelo y los cambios van de a uno
+
+    Quien necesite recorrer el grafo fuera del lock (la GUI del servidor)
+    usa snapshot(): una copia congelada que se rehace solo si hubo cambios.
+    """
     def __init__(self):
         self.graph = nx.Graph()
+        self.lock = RWLock()
+        self._version = 0
+        self._snapshot = None  # (versión, grafo congelado)
 
     def add_user(self, username: str):
         """Agrega un nodo (usuario) al grafo"""
-        if username not in self.graph:
-            self.graph.add_node(username)
-            return True
-        return False
+        with self.lock.writer:
+            if username not in self.graph:
+                self.graph.add_node(username)
+                self._version += 1
+                return True
+            return False
     
+    def load(self, usernames, friendships):
+        """Carga en bloque usuarios y amistades (arranque); ignora aristas a nodos inexistentes"""
+        with self.lock.writer:
+            self.graph.add_nodes_from(usernames)
+            graph = self.graph
+            self.graph.add_edges_from((user1, user2) for user1, user2 in friendships
+                                      if user1 in graph and user2 in graph)
+            self._version += 1
+
     def add_friendship(self, user1: str, user2: str):
         """Agrega una arista (amistad) bidireccional"""
-        if user1 in self.graph and user2 in self.graph:
-            self.graph.add_edge(user1, user2)
-            return True
-        return False
+        with self.lock.writer:
+            if user1 in self.graph and user2 in self.graph:
+                self.graph.add_edge(user1, user2)
+                self._version += 1
+                return True
+            return False
     
     def remove_friendship(self, user1: str, user2: str):
         """Elimina una arista (amistad) bidireccional"""
-        if self.graph.has_edge(user1, user2):
-            self.graph.remove_edge(user1, user2)
-            return True
-        return False
+        with self.lock.writer:
+            if self.graph.has_edge(user1, user2):
+                self.graph.remove_edge(user1, user2)
+                self._version += 1
+                return True
+            return False
     
     def get_friends(self, username: str) -> List[str]:
         """Retorna lista de amigos de un usuario"""
-        return list(self.graph.neighbors(username))
+        with self.lock.reader:
+            return list(self.graph.neighbors(username))
     
     def find_friend_path(self, start: str, end: str) -> Optional[List[str]]:
         """Busca un camino entre dos usuarios usando BFS"""
         try:
-            return nx.shortest_path(self.graph, source=start, target=end)
+            with self.lock.reader:
+                return nx.shortest_path(self.graph, source=start, target=end)
         
         except nx.NetworkXNoPath:
             return None
+
+    def snapshot(self) -> nx.Graph:
+        """Copia congelada del grafo (solo lectura), compartida hasta el próximo cambio"""
+        with self.lock.reader:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot[0] != self._version:
+                # Sin atributos que copiar: reconstruir es más rápido que graph.copy().
+                # Dos lectores pueden copiar a la vez; ambas copias son iguales
+                graph = nx.Graph()
+                graph.add_nodes_from(self.graph)
+                graph.add_edges_from(self.graph.edges())
+                snapshot = self._snapshot = (self._version, nx.freeze(graph))
+            return snapshot[1]
         
     def get_statistics(self) -> dict:
         """Calcula estadísticas del grafo"""
-        if self.graph.number_of_nodes() == 0:
+        with self.lock.reader:
+            # Grados de cada nodo
+            degrees = dict(self.graph.degree())
+        if not degrees:
             return {"max": (None, 0), "min": (None, 0), "avg": 0}
-        
-        # Grados de cada nodo
-        degrees = dict(self.graph.degree())
         max_user = max(degrees, key=degrees.get)
         min_user = min(degrees, key=degrees.get)
         avg = sum(degrees.values()) / len(degrees)
@@ -59,10 +98,11 @@ class SocialGraph:
     
     def draw_graph(self):
         """Dibuja el grafo usando NetworkX/Matplotlib"""
+        graph = self.snapshot()
         plt.figure(figsize=(10, 8))
-        pos = nx.spring_layout(self.graph, seed=42)
+        pos = nx.spring_layout(graph, seed=42)
         nx.draw(
-            self.graph, pos,
+            graph, pos,
             with_labels=True,
             node_color='lightblue',
             node_size=1500,
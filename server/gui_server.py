@@ -32,8 +32,8 @@ class GraphCanvas(FigureCanvasQTAgg):
             ax = self.fig.add_subplot(111)
             ax.clear()
             
-            # Obtener el grafo
-            G = self.graph_manager.graph
+            # Copia congelada: los handlers pueden modificar el grafo mientras se dibuja
+            G = self.graph_manager.snapshot()
             
             if G.number_of_nodes() == 0:
                 ax.text(0.5, 0.5, 'No hay usuarios en la red\n\nAgrega usuarios desde el cliente',
@@ -151,6 +151,14 @@ class ServerWindow(QMainWindow):
         self.users_label = QLabel("Usuarios registrados: 0")
         info_layout.addWidget(self.users_label)
 
+        self.connections_label = QLabel("Conexiones activas: 0")
+        self.connections_label.setWordWrap(True)
+        info_layout.addWidget(self.connections_label)
+
+        self.pool_label = QLabel("Cola de solicitudes: 0")
+        self.pool_label.setWordWrap(True)
+        info_layout.addWidget(self.pool_label)
+
         info_group.setLayout(info_layout)
         control_layout.addWidget(info_group)
 
@@ -251,9 +259,26 @@ class ServerWindow(QMainWindow):
         """Actualiza la visualización del grafo y la información"""
         try:
             # Actualizar conteos
-            num_users = len(self.server.db.data["users"])
+            num_users = len(self.server.db)
             self.users_label.setText(f"Usuarios registrados: {num_users}")
 
+            # Conexiones vivas
+            conns = self.server.connections.stats()
+            self.connections_label.setText(
+                f"Conexiones activas: {conns['active']}/{conns['max']}\n"
+                f"Rechazadas (lleno): {conns['refused']} · "
+                f"Cerradas por inactividad: {conns['reaped']}"
+            )
+
+            # Estado del pool de trabajadores
+            pool = self.server.pool.stats()
+            self.pool_label.setText(
+                f"Cola de solicitudes: {pool['queue_depth']}/{pool['queue_capacity']}\n"
+                f"Espera promedio: {pool['avg_wait_ms']:.1f} ms "
+                f"(máx {pool['max_wait_ms']:.1f} ms)\n"
+                f"Rechazadas (ocupado): {pool['rejected']}"
+            )
+
             # Actualizar el grafo
             self.graph_canvas.draw_graph()
 
@@ -283,8 +308,9 @@ class ServerWindow(QMainWindow):
                 stats_text += f"({stats['max'][1]} amigos)\n\n"
                 stats_text += f"Usuario con menos amigos: {stats['min'][0]} "
                 stats_text += f"Promedio de amigos por usuario: {stats['avg']:.2f}\n\n"
-                stats_text += f"Total de usuarios: {self.server.graph.graph.number_of_nodes()}\n"
-                stats_text += f"Total de conexiones: {self.server.graph.graph.number_of_edges()}"
+                graph = self.server.graph.snapshot()
+                stats_text += f"Total de usuarios: {graph.number_of_nodes()}\n"
+                stats_text += f"Total de conexiones: {graph.number_of_edges()}"
 
                 self.stats_text.setText(stats_text)
                 self.status_label_bar.setText("Estadísticas calculadas")
@@ -342,9 +368,10 @@ class ServerWindow(QMainWindow):
             try:
                 # Exportar datos del grafo
                 import json
+                graph = self.server.graph.snapshot()
                 data = {
-                    "usuarios": list(self.server.graph.graph.nodes()),
-                    "conexiones": list(self.server.graph.graph.edges()),
+                    "usuarios": list(graph.nodes()),
+                    "conexiones": list(graph.edges()),
                     "estadisticas": self.server.graph.get_statistics()
                 }
                 
@@ -0,0 +1,213 @@
+# Backend JSON con carga de usuarios a pedido para bases muy grandes
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Mapping, Optional
+from binary_snapshot import SnapshotReader, open_snapshot, write_snapshot
+from database import UserDataBase
+from user_record import RecordsView, UserRecord, UserView
+
+class LazyUsers:
+    """Usuarios del snapshot binario leídos a pedido, con una caché LRU acotada
+
+    Al arrancar solo quedan en memoria los usernames y su id (posición en
+    el snapshot). Los registros cambiados o creados desde el último
+    snapshot van a dirty y no se desalojan hasta que una compactación los
+    escribe; son a lo sumo dos por entrada del log, así que los acota
+    compact_threshold.
+    """
+    def __init__(self, reader: SnapshotReader, names: List[str], cache_size: int):
+        self.reader = reader
+        self.names = names
+        self.ids = {username: user_id for user_id, username in enumerate(names)}
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.dirty = {}
+        self.flushing = {}   # dirty que está escribiendo la compactación en curso
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pinned(self, username: str) -> Optional[UserRecord]:
+        record = self.dirty.get(username)
+        if record is None:
+            record = self.flushing.get(username)
+        return record
+
+    def __contains__(self, username: str) -> bool:
+        return username in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, username: str, default=None) -> Optional[UserRecord]:
+        record = self._pinned(username)
+        with self._lock:
+            if record is None:
+                record = self.cache.get(username)
+                if record is not None:
+                    self.cache.move_to_end(username)
+            if record is not None:
+                self.hits += 1
+                return record
+        user_id = self.ids.get(username)
+        if user_id is None:
+            return default
+        # Los usuarios que aún no están en el snapshot siempre están fijos
+        return self._store({username: self.reader.record(user_id)})[username]
+
+    def __getitem__(self, username: str) -> UserRecord:
+        record = self.get(username)
+        if record is None:
+            raise KeyError(username)
+        return record
+
+    def __setitem__(self, username: str, record: UserRecord):
+        """Registro nuevo o cambiado: queda fijo en memoria hasta el próximo snapshot"""
+        self.dirty[username] = record
+        self.ids.setdefault(username, record.id)
+        with self._lock:
+            # La caché podría tener la versión anterior (copiada por una vista)
+            self.cache.pop(username, None)
+
+    def get_many(self, usernames) -> Dict[str, UserRecord]:
+        """Varios registros: los residentes de una vez y los faltantes en orden de disco"""
+        found = {}
+        missing = []
+        with self._lock:
+            for username in usernames:
+                record = self._pinned(username)
+                if record is None:
+                    record = self.cache.get(username)
+                    if record is not None:
+                        self.cache.move_to_end(username)
+                if record is not None:
+                    found[username] = record
+                    self.hits += 1
+                elif username in self.ids:
+                    missing.append(username)
+        if missing:
+            ids = self.ids
+            missing.sort(key=ids.__getitem__)
+            found.update(self._store({username: self.reader.record(ids[username]) for username in missing}))
+        return found
+
+    def _store(self, records: Dict[str, UserRecord]) -> Dict[str, UserRecord]:
+        """Agrega a la caché lo leído de disco y desaloja lo menos usado"""
+        with self._lock:
+            cache = self.cache
+            for username, record in records.items():
+                cache[username] = record
+                cache.move_to_end(username)
+            self.misses += len(records)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+                self.evictions += 1
+        return records
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "cache_size": self.cache_size,
+                "cached": len(self.cache),
+                "pinned": len(self.dirty) + len(self.flushing),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+class LazyView(RecordsView):
+    """Vista inmutable: registros fijos más el resto leído del snapshot
+
+    Recorrerla no pasa por la caché, así que una búsqueda sobre todos los
+    usuarios no desaloja a los que se usan seguido.
+    """
+    def __init__(self, users: LazyUsers, names: List[str]):
+        super().__init__({**users.flushing, **users.dirty}, names)
+        self._reader = users.reader
+        self._ids = users.ids
+        self._count = len(names)  # names crece con cada usuario nuevo
+
+    def __getitem__(self, username: str) -> UserView:
+        record = self._records.get(username)
+        if record is None:
+            user_id = self._ids[username]
+            if user_id >= self._count:
+                raise KeyError(username)
+            record = self._reader.record(user_id)
+        return UserView(record, self._names)
+
+    def __contains__(self, username) -> bool:
+        return self._ids.get(username, self._count) < self._count
+
+    def __iter__(self):
+        return islice(self._names, self._count)
+
+    def __len__(self) -> int:
+        return self._count
+
+class LazyUserDataBase(UserDataBase):
+    """UserDataBase que no mantiene a todos los usuarios en memoria
+
+    Arranca leyendo solo los usernames del snapshot binario (mmap) y trae
+    cada usuario al primer acceso; el log, la durabilidad y la compactación
+    son los de UserDataBase. Si no hay un snapshot binario válido se lee el
+    JSON una vez para escribirlo.
+    """
+    def __init__(self, db_file: str = "users.json", cache_size: int = 10000, **options):
+        if options.get("shards", 1) != 1:
+            raise ValueError("lazy_load necesita el snapshot binario, que no admite shards")
+        self.cache_size = cache_size
+        options["binary_snapshot"] = True
+        super().__init__(db_file, **options)
+
+    def _load_data(self) -> Dict:
+        reader = open_snapshot(self.binary_file, self.db_file)
+        if reader is None:
+            users = super()._load_data()["users"]
+            view = RecordsView(users, self.names)
+            if not os.path.exists(self.db_file):
+                self._write_json(view)
+            write_snapshot(self.binary_file, view, os.stat(self.db_file))
+            self._binary_stale = False
+            del users, view
+            reader = open_snapshot(self.binary_file, self.db_file)
+        else:
+            self.names = reader.usernames()
+            self.loaded_from = "binary"
+        return {"users": LazyUsers(reader, self.names, self.cache_size)}
+
+    def _fetch(self, usernames) -> Dict[str, UserRecord]:
+        return self.data["users"].get_many(usernames)
+
+    def view(self) -> Mapping[str, Mapping]:
+        """Vista inmutable y consistente; solo se copian las referencias a los registros fijos"""
+        with self._rwlock.reader:
+            with self._view_lock:
+                if self._view is not None and self._view[0] == self._version:
+                    return self._view[1]
+                self._view_epoch = self._version
+                view = LazyView(self.data["users"], self.names)
+                self._view = (self._version, view)
+                return view
+
+    def _compaction_view(self) -> Mapping[str, Mapping]:
+        users = self.data["users"]
+        # Lo que se vuelca ahora sigue fijo hasta que el snapshot nuevo esté abierto
+        users.flushing.update(users.dirty)
+        users.dirty = {}
+        return self.view()
+
+    def _compacted(self, view: LazyView):
+        reader = open_snapshot(self.binary_file, self.db_file)
+        with self._lock:
+            users = self.data["users"]
+            users.reader = reader
+            users.flushing = {}
+            # La vista anterior mantiene abierto el snapshot viejo
+            self._version += 1
+
+    def stats(self) -> Dict:
+        return {**super().stats(), "cache": self.data["users"].stats()}
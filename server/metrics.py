@@ -0,0 +1,112 @@
+# Métricas por acción: conteos, errores e histogramas de latencia por etapa
+import math
+import threading
+from typing import Dict
+
+# Etapas del camino de una solicitud
+STAGES = ("decrypt", "parse", "handle", "serialize", "encrypt")
+
+class LatencyHistogram:
+    """Histograma con cubetas geométricas (error de ~±9% en los percentiles)"""
+    MIN_SECONDS = 1e-6
+    GROWTH = 2 ** 0.25
+    BUCKETS = 110  # 1 µs .. ~180 s
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        index = int(math.log(seconds / self.MIN_SECONDS, self.GROWTH)) + 1
+        return min(index, self.BUCKETS - 1)
+
+    def _midpoint(self, bucket: int) -> float:
+        """Punto medio geométrico de la cubeta"""
+        return self.MIN_SECONDS * self.GROWTH ** (bucket - 0.5)
+
+    def record(self, seconds: float):
+        bucket = self._bucket(seconds)
+        with self._lock:
+            self._counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Valor aproximado del percentil pedido (fraction entre 0 y 1)"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = fraction * self.count
+            seen = 0
+            for bucket, bucket_count in enumerate(self._counts):
+                seen += bucket_count
+                if seen >= target:
+                    return min(self._midpoint(bucket), self.max)
+            return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000
+        }
+
+class ActionMetrics:
+    """Conteo, errores y un histograma por etapa para una acción"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+
+    def add_result(self, error: bool):
+        with self._lock:
+            self.count += 1
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "stages": {
+                stage: histogram.snapshot()
+                for stage, histogram in self.stages.items() if histogram.count
+            }
+        }
+
+class ServerMetrics:
+    """Registro de métricas de todas las acciones del servidor"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._actions: Dict[str, ActionMetrics] = {}
+
+    def action(self, name: str) -> ActionMetrics:
+        metrics = self._actions.get(name)
+        if metrics is None:
+            with self._lock:
+                metrics = self._actions.setdefault(name, ActionMetrics())
+        return metrics
+
+    def record(self, action: str, stage: str, seconds: float):
+        """Registra la duración de una etapa"""
+        self.action(action or "?").stages[stage].record(seconds)
+
+    def add_result(self, action: str, error: bool):
+        """Cuenta una solicitud atendida y si terminó en error"""
+        self.action(action or "?").add_result(error)
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            actions = dict(self._actions)
+        return {name: metrics.snapshot() for name, metrics in sorted(actions.items())}
@@ -0,0 +1,67 @@
+"""
+Migra la base JSON existente al backend SQLite (una sola vez).
+
+Abre la base JSON como el servidor (reaplica el log pendiente y lee los
+shards si los hay) y copia usuarios y amistades en una transacción. Los
+datos JSON no cambian; solo queda compactado el log. Con --activate deja
+"sqlite" como backend en server_config.json.
+
+Uso: python migrate_to_sqlite.py [--json users.json] [--sqlite users.db] [--activate]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Tuple
+from config import CONFIG_FILE, load_config, save_config
+from database import LOG_SUFFIX, open_database
+from shards import find_layouts
+from sqlite_database import SqliteUserDataBase
+
+def migrate(json_path: str, sqlite_path: str, storage: Dict) -> Tuple[int, int]:
+    """Copia la base JSON (con su log) a SQLite; retorna (migrados, ya existentes)"""
+    layouts = find_layouts(os.path.abspath(json_path))
+    options = dict(storage, backend="json", json_path=json_path, lazy_load=False,
+                   binary_snapshot=False, compact_interval=0)
+    if len(layouts) == 1:
+        options["shards"] = layouts[0]  # La distribución que hay en disco
+    json_db = open_database(options)
+    try:
+        users = json_db.view()
+        db = SqliteUserDataBase(sqlite_path)
+        try:
+            imported = db.import_users(users)
+        finally:
+            db.close()
+    finally:
+        json_db.close()
+    return imported, len(users) - imported
+
+def main():
+    parser = argparse.ArgumentParser(description="Migración de users.json a SQLite")
+    parser.add_argument("--json", default="users.json", help="Archivo JSON de origen")
+    parser.add_argument("--sqlite", default="users.db", help="Base SQLite de destino")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--activate", action="store_true",
+                        help="Usar el backend SQLite a partir del próximo arranque")
+    args = parser.parse_args()
+
+    if not find_layouts(os.path.abspath(args.json)) and not os.path.exists(args.json + LOG_SUFFIX):
+        sys.exit(f"No existe {args.json}")
+
+    start = time.perf_counter()
+    try:
+        imported, skipped = migrate(args.json, args.sqlite, load_config(args.config)["storage"])
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"{imported} usuarios migrados a {args.sqlite} en {time.perf_counter() - start:.2f} s"
+          + (f" ({skipped} ya existían)" if skipped else ""))
+
+    if args.activate:
+        config = load_config(args.config)
+        config["storage"].update({"backend": "sqlite", "sqlite_path": args.sqlite})
+        save_config(config, args.config)
+        print(f"Backend SQLite activado en {args.config}")
+
+if __name__ == '__main__':
+    main()
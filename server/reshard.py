@@ -0,0 +1,69 @@
+"""
+Cambia la cantidad de shards en que se reparte users.json.
+
+Abre la base con la distribución que hay en disco (reaplicando el log
+pendiente), escribe todos los archivos de la nueva y después borra los de
+la anterior. Si se corta a mitad, la distribución anterior sigue completa
+y se puede volver a correr. Con --activate deja la cantidad en
+server_config.json. El servidor tiene que estar detenido.
+
+Uso: python reshard.py --shards 8 [--json users.json] [--activate]
+"""
+import argparse
+import os
+import sys
+import time
+from config import CONFIG_FILE, load_config, save_config
+from database import BINARY_SUFFIX, UserDataBase
+from shards import MAX_SHARDS, find_layouts, shard_paths, write_shards
+
+def main():
+    parser = argparse.ArgumentParser(description="Cambio de la cantidad de shards de users.json")
+    parser.add_argument("--shards", type=int, required=True, help="Cantidad de shards nueva (1 = un solo users.json)")
+    parser.add_argument("--json", default="users.json", help="users.json de la base")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--activate", action="store_true",
+                        help="Usar la cantidad nueva a partir del próximo arranque")
+    args = parser.parse_args()
+
+    if not 1 <= args.shards <= MAX_SHARDS:
+        sys.exit(f"La cantidad de shards tiene que estar entre 1 y {MAX_SHARDS}")
+    db_file = os.path.abspath(args.json)
+    layouts = find_layouts(db_file)
+    if not layouts:
+        sys.exit(f"No hay usuarios guardados en {args.json}")
+    # Si quedó a medias, la distribución de origen es la otra
+    previous = [shards for shards in layouts if shards != args.shards]
+    if len(previous) > 1:
+        sys.exit(f"Hay más de una distribución en disco ({', '.join(map(str, layouts))})")
+
+    start = time.perf_counter()
+    current = previous[0] if previous else args.shards
+    db = UserDataBase(db_file, compact_interval=0, binary_snapshot=False, shards=current)
+    try:
+        view = db.view()
+        if current != args.shards:
+            write_shards(db_file, args.shards, view)
+    finally:
+        # Con la distribución actual: vacía el log sin tocar shards que no cambiaron
+        db.close()
+    count = len(view)
+
+    if current != args.shards:
+        new_paths = set(shard_paths(db_file, args.shards))
+        old_paths = [path for path in shard_paths(db_file, current) if path not in new_paths]
+        if current == 1 and os.path.exists(db_file + BINARY_SUFFIX):
+            old_paths.append(db_file + BINARY_SUFFIX)
+        for path in old_paths:
+            os.remove(path)
+    print(f"{count} usuarios en {args.shards} shard(s) (antes {current}) "
+          f"en {time.perf_counter() - start:.2f} s")
+
+    if args.activate:
+        config = load_config(args.config)
+        config["storage"].update({"shards": args.shards, "json_path": args.json})
+        save_config(config, args.config)
+        print(f"{args.shards} shard(s) activados en {args.config}")
+
+if __name__ == '__main__':
+    main()
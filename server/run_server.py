@@ -1,29 +1,74 @@
 # run_server.py - Archivo principal para ejecutar el servidor con GUI
 import sys
+import argparse
 import threading
 from PyQt6.QtWidgets import QApplication, QSizePolicy
 from PyQt6.QtCore import QTimer
-from serverTCP import SocialtecServer
+from serverTCP import SocialtecServer, ENGINES
 from gui_server import ServerWindow
+from config import CONFIG_FILE, load_config
+from shared.logs import setup_logging, parse_module_levels
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servidor SocialTEC")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--engine", choices=ENGINES, default="thread",
+                        help="thread: un hilo por cliente, async: event loop asyncio")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Hilos del pool que ejecutan las solicitudes")
+    parser.add_argument("--queue-size", type=int, default=128,
+                        help="Solicitudes en espera antes de responder 'ocupado'")
+    parser.add_argument("--max-connections", type=int, default=1000,
+                        help="Conexiones simultáneas antes de rechazar nuevas")
+    parser.add_argument("--idle-timeout", type=float, default=300.0,
+                        help="Segundos sin actividad antes de cerrar una conexión (0 = nunca)")
+    parser.add_argument("--send-timeout", type=float, default=30.0,
+                        help="Segundos que puede bloquearse un envío antes de cerrar la conexión (0 = sin límite)")
+    parser.add_argument("--hash-workers", type=int, default=None,
+                        help="Procesos para pbkdf2 (por defecto uno por núcleo, 0 = en el mismo hilo)")
+    parser.add_argument("--config", default=CONFIG_FILE,
+                        help="Archivo de configuración (política de pbkdf2, ver calibrate_kdf.py)")
+    parser.add_argument("--session-ttl", type=float, default=3600.0,
+                        help="Segundos sin uso antes de que expire un token de sesión")
+    parser.add_argument("--log-level", default="INFO",
+                        help="Nivel de log general (DEBUG, INFO, WARNING, ERROR)")
+    parser.add_argument("--log-module", action="append", default=[], metavar="MODULO=NIVEL",
+                        help="Nivel por módulo, p. ej. server.frames=DEBUG (repetible)")
+    parser.add_argument("--log-sample-every", type=int, default=100,
+                        help="Registrar 1 de cada N líneas DEBUG por frame")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    setup_logging(args.log_level, parse_module_levels(args.log_module), args.log_sample_every)
+
     # Crear instancia del servidor
-    server = SocialtecServer(host="localhost", port=8080)
-    server._load_existing_users()
+    server = SocialtecServer(
+        host=args.host, port=args.port,
+        engine=args.engine, workers=args.workers, queue_size=args.queue_size,
+        max_connections=args.max_connections, idle_timeout=args.idle_timeout,
+        hash_workers=args.hash_workers, session_ttl=args.session_ttl,
+        send_timeout=args.send_timeout,
+        config=load_config(args.config)
+    )
     
     # Iniciar servidor en un hilo separado
     server_thread = threading.Thread(target=server.start, daemon=True)
     server_thread.start()
     
     # Crear aplicación PyQt
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1])
     
     # Crear ventana principal del servidor
     window = ServerWindow(server)
     window.show()
 
     QTimer.singleShot(1000, window.update_graph)
-    
+
+    # El hilo del servidor es daemon: sin esto el proceso termina sin cerrar
+    # la base y en modo interval se pierde la última ventana del log
+    app.aboutToQuit.connect(server.stop)
     sys.exit(app.exec())
 
 if __name__ == '__main__':
@@ -0,0 +1,170 @@
+# Lock de lectores/escritor con métricas de espera
+import threading
+import time
+from typing import Dict
+from metrics import LatencyHistogram
+
+class RWLock:
+    """Varios lectores a la vez o un solo escritor
+
+    Los escritores tienen prioridad: si uno espera, los lectores nuevos
+    esperan detrás de él (una lectura ya tomada puede anidarse). La
+    escritura es reentrante y quien escribe también puede leer; pasar de
+    lectura a escritura no está permitido (dos lectores se bloquearían).
+
+    Uso: "with lock.reader:" o "with lock.writer:". lock.writer sirve como
+    lock de un threading.Condition.
+    """
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._cond = threading.Condition(self._mutex)
+        self._readers = 0
+        self._writer = None        # Ident del hilo que escribe
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._waiting_readers = 0
+        self._local = threading.local()  # Lecturas anidadas del hilo
+
+        # Métricas: adquisiciones, cuántas tuvieron que esperar y cuánto
+        # (el camino sin espera no mide tiempo para mantenerse barato)
+        self.reads = 0
+        self.writes = 0
+        self.contended_reads = 0
+        self.contended_writes = 0
+        self.read_waits = LatencyHistogram()
+        self.write_waits = LatencyHistogram()
+
+        self.reader = _ReadSide(self)
+        self.writer = _WriteSide(self)
+
+    def acquire_read(self):
+        local = self._local
+        depth = getattr(local, "reads", 0)
+        if depth:
+            local.reads = depth + 1
+            return
+        if self._writer == threading.get_ident():
+            # Lectura dentro de una escritura propia: no cuenta como lector
+            local.reads, local.counted = 1, False
+            return
+        with self._mutex:
+            self.reads += 1
+            if self._writer is not None or self._waiting_writers:
+                self.contended_reads += 1
+                start = time.perf_counter()
+                self._waiting_readers += 1
+                try:
+                    while self._writer is not None or self._waiting_writers:
+                        self._cond.wait()
+                finally:
+                    self._waiting_readers -= 1
+                self.read_waits.record(time.perf_counter() - start)
+            self._readers += 1
+        local.reads, local.counted = 1, True
+
+    def release_read(self):
+        local = self._local
+        local.reads -= 1
+        if local.reads or not local.counted:
+            return
+        with self._mutex:
+            self._readers -= 1
+            if not self._readers and self._waiting_writers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if getattr(self._local, "reads", 0) and self._local.counted:
+            raise RuntimeError("No se puede pasar de lectura a escritura")
+        with self._mutex:
+            self.writes += 1
+            if self._writer is not None or self._readers:
+                self.contended_writes += 1
+                start = time.perf_counter()
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self.write_waits.record(time.perf_counter() - start)
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        if self._writer != threading.get_ident():
+            raise RuntimeError("release_write sin tener el lock")
+        self._write_depth -= 1
+        if self._write_depth:
+            return
+        with self._mutex:
+            self._writer = None
+            if self._waiting_writers or self._waiting_readers:
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        return {
+            "readers": self._readers,
+            "writing": self._writer is not None,
+            "waiting_writers": self._waiting_writers,
+            "reads": self.reads,
+            "writes": self.writes,
+            "contended_reads": self.contended_reads,
+            "contended_writes": self.contended_writes,
+            "read_wait": self.read_waits.snapshot(),
+            "write_wait": self.write_waits.snapshot()
+        }
+
+class _ReadSide:
+    def __init__(self, lock: RWLock):
+        self._rw = lock
+
+    def acquire(self):
+        self._rw.acquire_read()
+        return True
+
+    def release(self):
+        self._rw.release_read()
+
+    def __enter__(self):
+        self._rw.acquire_read()
+        return self
+
+    def __exit__(self, *exc):
+        self._rw.release_read()
+
+class _WriteSide:
+    """Lado escritor; implementa lo que threading.Condition espera de un RLock"""
+    def __init__(self, lock: RWLock):
+        self._rw = lock
+
+    def acquire(self):
+        self._rw.acquire_write()
+        return True
+
+    def release(self):
+        self._rw.release_write()
+
+    def __enter__(self):
+        self._rw.acquire_write()
+        return self
+
+    def __exit__(self, *exc):
+        self._rw.release_write()
+
+    # Condition.wait suelta el lock por completo y lo recupera con la misma profundidad
+    def _is_owned(self) -> bool:
+        return self._rw._writer == threading.get_ident()
+
+    def _release_save(self) -> int:
+        depth = self._rw._write_depth
+        self._rw._write_depth = 1
+        self._rw.release_write()
+        return depth
+
+    def _acquire_restore(self, depth: int):
+        self._rw.acquire_write()
+        self._rw._write_depth = depth
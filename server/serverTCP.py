@@ -1,198 +1,741 @@
 # Socket Principal, manejo de clientes
 import socket
 import os
+import sys
 import threading
 import json
+import time
+import asyncio
 from graph_manager import SocialGraph
-from database import UserDataBase
+from database import open_database
+from blob_store import BlobStore, is_blob_id
+from worker_pool import WorkerPool, BUSY_RESPONSE
+from connections import ClientConnection, ConnectionRegistry, FULL_RESPONSE, set_send_timeout
+from metrics import ServerMetrics
+from sessions import SessionStore
+from config import load_config
+from typing import Callable
 from auth import *
 
+# Código compartido con el cliente (carpeta shared/ en la raíz del proyecto)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.framing import (recv_frame, send_frame, frame_header, check_frame_length,
+                            IncompleteFrameError, FrameTooLargeError)
+from shared.compression import COMPRESSIONS, DEFAULT_THRESHOLD, CompressionStats, decompress_payload
+from shared.serialization import CODECS, get_codec
+from shared.logs import get_logger
+from shared.ciphers import CIPHERS, AesGcmSession, derive_session_key, new_session_nonce
+
+log = get_logger("server")
+frame_log = get_logger("server.frames")  # Una línea por frame, muestreada
+
+# Motores de servicio disponibles
+ENGINES = ("thread", "async")
+
+# Acciones que pueden bloquear: pbkdf2, disco (log, SQLite, mmap de la carga
+# a pedido, fotos), locks de la base o del grafo, o recorridos de todos los
+# usuarios. En el motor async se envían al pool de trabajadores para no
+# detener el event loop; solo logout (sesiones en memoria) corre en el loop
+BLOCKING_ACTIONS = {
+    "login", "register", "change_password", "resume",
+    "update_profile", "add_friend", "remove_friend", "get_photo", "batch",
+    "get_profile", "get_friends", "find_path", "get_suggestions", "search_user",
+    "get_stats", "get_server_metrics"
+}
+
+# Máximo de sub-solicitudes en una acción batch
+MAX_BATCH_SIZE = 100
+
+# Campo que identifica al usuario en cada acción; si la solicitud trae
+# "token", el servidor lo llena con el dueño de la sesión
+SESSION_FIELDS = {
+    "resume": "username",
+    "logout": "username",
+    "get_profile": "username",
+    "update_profile": "username",
+    "change_password": "username",
+    "add_friend": "user1",
+    "remove_friend": "user1",
+    "get_friends": "username",
+    "find_path": "start",
+    "get_suggestions": "username",
+    "search_user": "current_user"
+}
+
+INVALID_SESSION = {"status": "error", "code": "invalid_session", "message": "Sesión inválida o expirada"}
+
+def with_request_id(response: dict, request_id=None) -> dict:
+    """Copia la respuesta agregando el id de la solicitud (si lo hay)"""
+    if request_id is None:
+        return response
+    return {**response, "id": request_id}
+
+def public_profile(username: str, user_data: dict, photo: bool = False) -> dict:
+    """Datos del usuario que se envían al cliente (nunca el hash de la contraseña)"""
+    profile = {"username": username, "name": user_data["name"], "friends": user_data["friends"]}
+    if photo:
+        # Solo el id; la imagen se pide con get_photo
+        profile["photo_id"] = user_data.get("photo", "")
+    return profile
+
 class SocialtecServer:
-    def __init__(self, host="localhost", port=8080):
+    def __init__(self, host="localhost", port=8080, engine="thread", workers=8, queue_size=128,
+                 compression_threshold=DEFAULT_THRESHOLD, max_connections=1000, idle_timeout=300.0,
+                 hash_workers=None, session_ttl=3600.0, send_timeout=30.0, config=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Motor desconocido: {engine}")
         self.host = host
         self.port = port
+        self.engine = engine
+        self.config = config if config is not None else load_config()
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.clients = []
+        self.connections = ConnectionRegistry(max_connections, idle_timeout)
+        self.send_timeout = send_timeout
+        self.compression_threshold = compression_threshold
+        self.compression_stats = CompressionStats()
+        self.metrics = ServerMetrics()
+        self.sessions = SessionStore(session_ttl)
         self.graph = SocialGraph()
-        self.db = UserDataBase()
+        start = time.perf_counter()
+        self.db = open_database(self.config["storage"])
+        self.startup = {"database": time.perf_counter() - start}
+        self.photos = BlobStore(self.config["storage"].get("photos_dir", "photos"),
+                                use_mmap=self.config["storage"].get("photos_mmap", False))
         
         # Cargar clave desde archivo compartido
         key_file = "../shared/secret.key"
         if os.path.exists(key_file):
             with open(key_file, 'rb') as f:
                 key = f.read()
-            print(f"Clave cargada desde {key_file}")
+            log.info("Clave cargada desde %s", key_file)
         else:
             # Generar y guardar clave si no existe
             key = generate_key()
             os.makedirs(os.path.dirname(key_file), exist_ok=True)
             with open(key_file, 'wb') as f:
                 f.write(key)
-            print(f"Clave generada y guardada en {key_file}")
+            log.info("Clave generada y guardada en %s", key_file)
         
-        self.auth = AuthManager(key)
+        # pbkdf2 corre en un pool de procesos (hash_workers=None: uno por núcleo)
+        self.auth = AuthManager(key, hash_workers=hash_workers, rounds=self.config["kdf"]["rounds"])
+        self.secret_key = key
+        self.fernet = self.auth.cipher  # Cifrado por defecto de cada conexión
+        # Pool acotado que ejecuta process_request; las conexiones solo enmarcan
+        self.pool = WorkerPool(self.process_request, workers=workers, queue_size=queue_size)
+        self.actions = {}
+        self._register_actions()
         self._load_existing_users()  # Cargar usuarios existentes
 
+        # Cierre ordenado (stop): el motor async deja aquí su loop y su servidor
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        self._running = False
+        self._loop = None
+        self._async_server = None
+
     def _load_existing_users(self):
         """"Carga usuarios existentes en el grafo"""
-        for username in self.db.data["users"]:
-            self.graph.add_user(username)
-            # Cargar amistades existentes
-            for friend in self.db.data["users"][username]["friends"]:
-                self.graph.add_friendship(username, friend)
+        start = time.perf_counter()
+        # Una sola pasada: con lazy_load los usuarios se leen de disco sin quedar en memoria
+        usernames = []
+        friendships = []
+        legacy_photos = []
+        for username, user_data in self.db.users():
+            usernames.append(username)
+            # La base guarda cada amistad en ambos usuarios: basta una arista por par
+            friendships.extend((username, friend) for friend in user_data["friends"] if username < friend)
+            if user_data.get("photo") and not is_blob_id(user_data["photo"]):
+                legacy_photos.append((username, user_data["photo"]))
+        self.graph.load(usernames, friendships)
+        self.startup["graph"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if legacy_photos:
+            self._migrate_photos(legacy_photos)
+        self.startup["photos"] = time.perf_counter() - start
+
+        # Fases de la base (snapshot, replay del log...) y del servidor en una línea
+        phases = {**{f"db.{phase}": seconds for phase, seconds in self.db.load_times.items()},
+                  **self.startup}
+        log.info("Arranque con %d usuarios (%s): %s", len(usernames),
+                 self.db.loaded_from,
+                 ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in phases.items()))
+
+    def _migrate_photos(self, legacy_photos):
+        """Pasa las fotos en base64 guardadas en los usuarios al almacén de blobs"""
+        with self.db.batch():
+            for username, photo in legacy_photos:
+                try:
+                    photo_id = self.photos.put_base64(photo)
+                except ValueError:
+                    log.warning("Foto inválida de %s descartada", username)
+                    photo_id = ""
+                self.db.update_user(username, photo=photo_id)
+        log.info("%d fotos migradas a %s", len(legacy_photos), self.photos.root)
 
     def start(self):
-        """"Inicia el servidor"""
+        """"Inicia el servidor con el motor configurado; retorna después de stop()"""
+        self._running = True
+        self.auth.hasher.start()
+        self.pool.start()
+        self.connections.start_reaper()
+        try:
+            if self.engine == "async":
+                asyncio.run(self._start_async())
+            else:
+                self._start_threaded()
+        finally:
+            self._shutdown()
+
+    def stop(self, timeout: float = 30.0):
+        """Deja de aceptar conexiones, cierra las abiertas y vuelca la base
+
+        Retorna cuando la base quedó cerrada (log escrito y compactado, con
+        el snapshot binario al día) o cuando vence timeout.
+        """
+        if self._stopped.is_set():
+            return
+        self._stopping.set()
+        if not self._running:
+            self._shutdown()
+            return
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_server.close)
+        else:
+            try:
+                # shutdown despierta al hilo bloqueado en accept
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.server_socket.close()
+        for conn in self.connections.snapshot():
+            conn.close()
+        if not self._stopped.wait(timeout):
+            log.error("El servidor no terminó de cerrarse en %.0f s", timeout)
+
+    def _shutdown(self):
+        """Termina lo que está en curso y recién entonces cierra la base"""
+        if self._stopped.is_set():
+            return
+        self.connections.stop_reaper()
+        self.pool.stop(timeout=10.0)
+        self.auth.hasher.stop()
+        self.db.close()
+        self._stopped.set()
+        log.info("Servidor detenido")
+
+    def _start_threaded(self):
+        """Motor clásico: un hilo del sistema por cliente"""
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
-        print(f"Servidor SocialTEC escuchando en {self.host}:{self.port}")
+        self.server_socket.listen(socket.SOMAXCONN)
+        log.info("Servidor SocialTEC escuchando en %s:%s", self.host, self.port)
 
         while True:
-            client_socket, address = self.server_socket.accept()
-            print(f"Nuevo cliente conectado: {address}")
+            try:
+                client_socket, address = self.server_socket.accept()
+            except OSError:
+                if self._stopping.is_set():
+                    return
+                raise
+            conn = ClientConnection(address, self.fernet, sock=client_socket)
+            set_send_timeout(client_socket, self.send_timeout)
+            if not self.connections.register(conn):
+                self._refuse(conn)
+                continue
+
+            log.info("Nuevo cliente conectado: %s", address)
             cliente_thread = threading.Thread(
                 target=self.handle_client,
-                args=(client_socket,)
+                args=(conn,)
             )
             cliente_thread.start()
 
-    def handle_client(self, client_socket):
-        """Maneja comunicación con un cliente - CON PROTOCOLO DE LONGITUD"""
-        self.clients.append(client_socket)
-        client_address = client_socket.getpeername()
+    def _refuse(self, conn: ClientConnection):
+        """Avisa que el servidor está lleno y cierra, sin crear un hilo"""
+        log.warning("Conexión rechazada (máximo %d): %s", self.connections.max_connections, conn.address)
+        with conn.sock:
+            try:
+                conn.sock.settimeout(1.0)
+                self._send_frame(conn, FULL_RESPONSE)
+            except OSError:
+                pass
+
+    ########## CODIFICACIÓN DE FRAMES ##########
+
+    def _metric_action(self, action):
+        """Nombre bajo el que se registran las métricas de una acción
+
+        La acción la manda el cliente: las que no existen van todas a
+        "invalid" para no crear métricas nuevas con cada nombre distinto.
+        """
+        if action is None or action == "negotiate" or (isinstance(action, str) and action in self.actions):
+            return action
+        return "invalid"
+
+    def _decode_request(self, conn: ClientConnection, encrypted_data) -> dict:
+        """Desencripta y parsea un frame recibido (bytes directo al cifrado)"""
+        start = time.perf_counter()
+        try:
+            data = conn.cipher.decrypt(encrypted_data)
+            if conn.compression:
+                data = decompress_payload(data)
+        except Exception:
+            self.metrics.record("invalid", "decrypt", time.perf_counter() - start)
+            raise
+        decrypted = time.perf_counter()
+
+        request = conn.codec.decode(data) if data else None
+        parsed = time.perf_counter()
+        action = self._metric_action(request.get("action")) if isinstance(request, dict) else "invalid"
+        self.metrics.record(action, "decrypt", decrypted - start)
+        self.metrics.record(action, "parse", parsed - decrypted)
+
+        if not isinstance(request, dict):
+            raise ValueError("La solicitud debe ser un objeto")
+        return request
+
+    def _encode_response(self, conn: ClientConnection, response: dict, action: str = None) -> bytes:
+        """Serializa con el codec y comprime si se negoció
+
+        El cifrado se aplica después, bajo el lock de envío, porque los
+        cifrados de sesión numeran los frames en el orden en que salen.
+        """
+        action = self._metric_action(action)
+        start = time.perf_counter()
+        data = conn.codec.encode(response)
+        if conn.compression:
+            data = self.compression_stats.compress(action, data, self.compression_threshold)
+        self.metrics.record(action, "serialize", time.perf_counter() - start)
+        return data
+
+    def _encrypt_frame(self, conn: ClientConnection, data: bytes, action: str = None) -> bytes:
+        """Encripta con el cifrado de la conexión (llamar con el lock de envío)"""
+        action = self._metric_action(action)
+        start = time.perf_counter()
+        payload = conn.cipher.encrypt(data)
+        self.metrics.record(action, "encrypt", time.perf_counter() - start)
+        return payload
+
+    def _negotiate(self, conn: ClientConnection, request: dict):
+        """Opciones por conexión; solo se aceptan como primera solicitud
+
+        Retorna (respuesta, cifrado de sesión o None). La clave de sesión se
+        deriva aquí: si los nonces no sirven se responde error y la conexión
+        sigue con el cifrado anterior, igual que el cliente.
+        """
+        if conn.frames_received != 1:
+            return {"status": "error", "message": "negotiate debe ser la primera solicitud"}, None
+
+        compression = request.get("compression")
+        if compression is not None and compression not in COMPRESSIONS:
+            return {"status": "error", "message": f"Compresión no soportada: {compression}"}, None
+
+        codec = request.get("codec", conn.codec.name)
+        if codec not in CODECS:
+            return {"status": "error", "message": f"Codec no soportado: {codec}"}, None
+
+        cipher = request.get("cipher", conn.cipher.name)
+        if cipher not in CIPHERS:
+            return {"status": "error", "message": f"Cifrado no soportado: {cipher}"}, None
+
+        response = {
+            "status": "success",
+            "compression": compression,
+            "compression_threshold": self.compression_threshold,
+            "codec": codec,
+            "cipher": cipher
+        }
+        session = None
+        if cipher == "aesgcm":
+            client_nonce = request.get("client_nonce")
+            if not isinstance(client_nonce, str):
+                return {"status": "error", "message": "aesgcm requiere client_nonce"}, None
+            response["server_nonce"] = new_session_nonce()
+            try:
+                session_key = derive_session_key(self.secret_key, client_nonce, response["server_nonce"])
+            except ValueError:
+                # binascii.Error y CipherError son ValueError
+                return {"status": "error", "message": "client_nonce inválido"}, None
+            session = AesGcmSession(session_key, is_server=True)
+        return response, session
+
+    def _apply_negotiation(self, conn: ClientConnection, response: dict, session):
+        """Activa las opciones una vez enviada la respuesta en el formato anterior"""
+        if response.get("status") != "success":
+            return
+        conn.compression = response.get("compression")
+        conn.codec = get_codec(response["codec"])
+        if session is not None:
+            conn.cipher = session
+
+    ########## MOTOR DE HILOS ##########
+
+    def _send_frame(self, conn: ClientConnection, response: dict, action: str = None):
+        """Envía una respuesta; el lock evita mezclar frames de varios trabajadores"""
+        data = self._encode_response(conn, response, action)
+        with conn.send_lock:
+            payload = self._encrypt_frame(conn, data, action)
+            send_frame(conn.sock, payload)
+        conn.touch()
+        frame_log.debug("Respuesta enviada a %s (%d bytes)", conn.address, len(payload))
+
+    def _send_result(self, conn: ClientConnection, future, request: dict):
+        """Espera el resultado del pool y lo envía etiquetado con su id"""
+        try:
+            response = future.result()
+        except Exception as e:
+            log.exception("Error procesando solicitud")
+            response = {"status": "error", "message": f"Error interno: {str(e)}"}
+
+        request_id = request.get("id")
+        try:
+            self._send_frame(conn, with_request_id(response, request_id), request.get("action"))
+        except OSError as e:
+            # El cliente se desconectó antes de que terminara el trabajador, o no
+            # lee y venció send_timeout: el frame pudo quedar a medias, se cierra
+            log.info("No se pudo enviar la respuesta %s: %s", request_id, e)
+            conn.close()
+
+    def handle_client(self, conn: ClientConnection):
+        """Maneja comunicación con un cliente - CON PROTOCOLO DE LONGITUD
+
+        Este hilo solo enmarca: el trabajo de cada solicitud lo hace el pool.
+        Las solicitudes con "id" se responden cuando terminan (pipelining),
+        las que no lo traen se responden en orden, como antes.
+        """
+        client_socket = conn.sock
 
         with client_socket:
-            while True:
-                try:
-                    # 1. RECIBIR LONGITUD DEL MENSAJE (4 bytes)
-                    length_bytes = client_socket.recv(4)
-                    if not length_bytes:
-                        print("Cliente desconectado")
+            try:
+                while True:
+                    # 1-2. RECIBIR FRAME COMPLETO (longitud de 4 bytes + mensaje)
+                    try:
+                        encrypted_data = recv_frame(client_socket)
+                    except IncompleteFrameError as e:
+                        log.warning("Mensaje incompleto de %s: %d/%d bytes", conn.address, e.received, e.expected)
+                        break
+                    except FrameTooLargeError as e:
+                        log.warning("Conexión cerrada con %s: %s", conn.address, e)
+                        break
+                    if encrypted_data is None:
                         break
                     
-                    message_length = int.from_bytes(length_bytes, 'big')
-                    print(f"Esperando mensaje de {message_length} bytes")
-                    
-                    # 2. RECIBIR MENSAJE COMPLETO
-                    encrypted_data = b""
-                    while len(encrypted_data) < message_length:
-                        chunk = client_socket.recv(min(4096, message_length - len(encrypted_data)))
-                        if not chunk:
-                            break
-                        encrypted_data += chunk
+                    conn.frames_received += 1
+                    conn.touch()
+                    frame_log.debug("Mensaje completo recibido de %s (%d bytes)", conn.address, len(encrypted_data))
                     
-                    if len(encrypted_data) != message_length:
-                        print(f"Mensaje incompleto: {len(encrypted_data)}/{message_length} bytes")
-                        # Enviar error al cliente
-                        error_response = json.dumps({
+                    # 3. DESENCRIPTAR
+                    try:
+                        request = self._decode_request(conn, encrypted_data)
+                    except json.JSONDecodeError as e:
+                        log.warning("JSON inválido de %s: %s", conn.address, e)
+                        self._send_frame(conn, {
                             "status": "error", 
-                            "message": "Mensaje incompleto recibido"
+                            "message": "JSON inválido recibido"
                         })
-                        encrypted_error = self.auth.encrypt_data(error_response)
-                        error_length = len(encrypted_error)
-                        client_socket.send(error_length.to_bytes(4, 'big'))
-                        client_socket.send(encrypted_error.encode())
                         continue
-                    
-                    print(f"Mensaje completo recibido ({len(encrypted_data)} bytes)")
-                    
-                    # 3. DESENCRIPTAR
-                    try:
-                        data = self.auth.decrypt_data(encrypted_data.decode())
-                        request = json.loads(data)
                     except Exception as e:
-                        print(f"Error desencriptando/parseando: {e}")
-                        # Enviar error
-                        error_response = json.dumps({
+                        log.warning("Error desencriptando/parseando de %s: %s", conn.address, e)
+                        self._send_frame(conn, {
                             "status": "error", 
                             "message": f"Error procesando mensaje: {str(e)}"
                         })
-                        encrypted_error = self.auth.encrypt_data(error_response)
-                        error_length = len(encrypted_error)
-                        client_socket.send(error_length.to_bytes(4, 'big'))
-                        client_socket.send(encrypted_error.encode())
+                        continue
+
+                    request_id = request.get("id")
+                    action = request.get("action")
+
+                    # Negociación de la conexión: se atiende aquí, no en el pool
+                    if action == "negotiate":
+                        response, session = self._negotiate(conn, request)
+                        self._send_frame(conn, with_request_id(response, request_id), action)
+                        self._apply_negotiation(conn, response, session)
                         continue
                     
-                    # 4. PROCESAR SOLICITUD
-                    response = self.process_request(request)
-                    
-                    # 5. ENVIAR RESPUESTA CON PROTOCOLO DE LONGITUD
-                    response_json = json.dumps(response)
-                    encrypted_response = self.auth.encrypt_data(response_json)
-                    response_length = len(encrypted_response)
-                    
-                    # Enviar longitud
-                    client_socket.send(response_length.to_bytes(4, 'big'))
-                    # Enviar mensaje
-                    client_socket.sendall(encrypted_response.encode())
-                    print(f"Respuesta enviada ({response_length} bytes)")
+                    # 4. ENCOLAR SOLICITUD EN EL POOL (respuesta rápida si está lleno)
+                    future = self.pool.submit(request)
+                    if future is None:
+                        self._send_frame(conn, with_request_id(BUSY_RESPONSE, request_id), action)
+                    elif request_id is not None:
+                        # 5a. PIPELINING: responder cuando termine, sin bloquear la lectura
+                        future.add_done_callback(
+                            lambda f, req=request: self._send_result(conn, f, req)
+                        )
+                    else:
+                        # 5b. MODO CLÁSICO: esperar y responder en orden
+                        self._send_result(conn, future, request)
                 
-                except json.JSONDecodeError as e:
-                    print(f"Error JSON: {e}")
-                    # Enviar error JSON
-                    error_response = json.dumps({
-                        "status": "error", 
-                        "message": "JSON inválido recibido"
-                    })
-                    encrypted_error = self.auth.encrypt_data(error_response)
-                    error_length = len(encrypted_error)
-                    try:
-                        client_socket.send(error_length.to_bytes(4, 'big'))
-                        client_socket.send(encrypted_error.encode())
-                    except:
-                        pass
+            except Exception as e:
+                log.error("Error con el cliente %s: %s", conn.address, e)
+            finally:
+                self.connections.unregister(conn)
+                log.info("Cliente %s desconectado", conn.address)
+
+    ########## MOTOR ASYNCIO ##########
+
+    async def _start_async(self):
+        """Motor asyncio: un solo event loop atiende todas las conexiones"""
+        server = await asyncio.start_server(self.handle_client_async, self.host, self.port)
+        self._async_server = server
+        self._loop = asyncio.get_running_loop()
+        if self._stopping.is_set():
+            server.close()
+            return
+        log.info("Servidor SocialTEC (asyncio) escuchando en %s:%s", self.host, self.port)
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                # stop() cerró el servidor desde otro hilo
+                if not self._stopping.is_set():
+                    raise
+
+    async def _write_frame_async(self, conn: ClientConnection, response: dict, action: str = None):
+        """Escribe una respuesta completa sin intercalarla con otras tareas"""
+        data = self._encode_response(conn, response, action)
+        async with conn.send_lock:
+            payload = self._encrypt_frame(conn, data, action)
+            conn.writer.writelines((frame_header(len(payload)), payload))
+            await conn.writer.drain()
+        conn.touch()
+        frame_log.debug("Respuesta enviada a %s (%d bytes)", conn.address, len(payload))
+
+    async def _respond_async(self, conn: ClientConnection, request: dict):
+        """Procesa una solicitud con id y la responde apenas termina"""
+        response = await self.process_request_async(request)
+        try:
+            await self._write_frame_async(conn, with_request_id(response, request.get("id")), request.get("action"))
+        except ConnectionError as e:
+            log.info("No se pudo enviar la respuesta %s: %s", request.get("id"), e)
+
+    async def handle_client_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Maneja un cliente con streams - MISMO PROTOCOLO DE LONGITUD"""
+        conn = ClientConnection(writer.get_extra_info("peername"), self.fernet, writer=writer)
+        if not self.connections.register(conn):
+            log.warning("Conexión rechazada (máximo %d): %s", self.connections.max_connections, conn.address)
+            try:
+                await self._write_frame_async(conn, FULL_RESPONSE)
+            except ConnectionError:
+                pass
+            writer.close()
+            return
+        log.info("Nuevo cliente conectado: %s", conn.address)
+        pending = set()  # Tareas de solicitudes con id aún en curso
+
+        try:
+            while True:
+                # 1. RECIBIR LONGITUD DEL MENSAJE (4 bytes)
+                try:
+                    length_bytes = await reader.readexactly(4)
+                except asyncio.IncompleteReadError:
+                    break
+
+                message_length = int.from_bytes(length_bytes, 'big')
+                try:
+                    check_frame_length(message_length)
+                except FrameTooLargeError as e:
+                    log.warning("Conexión cerrada con %s: %s", conn.address, e)
+                    break
+
+                # 2. RECIBIR MENSAJE COMPLETO
+                try:
+                    encrypted_data = await reader.readexactly(message_length)
+                except asyncio.IncompleteReadError as e:
+                    log.warning("Mensaje incompleto de %s: %d/%d bytes", conn.address, len(e.partial), message_length)
+                    break
+                conn.frames_received += 1
+                conn.touch()
+                frame_log.debug("Mensaje completo recibido de %s (%d bytes)", conn.address, message_length)
+
+                # 3. DESENCRIPTAR
+                try:
+                    request = self._decode_request(conn, encrypted_data)
                 except Exception as e:
-                    print(f"Error con el cliente: {client_address}: {e}")
-                finally:
-                    if client_socket in self.clients:
-                        self.clients.remove(client_socket)
-                    print(f"Cliente {client_address} desconectado")
-    
+                    log.warning("Error desencriptando/parseando de %s: %s", conn.address, e)
+                    await self._write_frame_async(conn, {
+                        "status": "error",
+                        "message": f"Error procesando mensaje: {str(e)}"
+                    })
+                    continue
+
+                # 4. PROCESAR SOLICITUD
+                action = request.get("action")
+                if action == "negotiate":
+                    response, session = self._negotiate(conn, request)
+                    await self._write_frame_async(conn, with_request_id(response, request.get("id")), action)
+                    self._apply_negotiation(conn, response, session)
+                elif request.get("id") is not None:
+                    # Pipelining: cada solicitud con id se responde al terminar
+                    task = asyncio.create_task(self._respond_async(conn, request))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                else:
+                    response = await self.process_request_async(request)
+                    await self._write_frame_async(conn, response, action)
+
+        except ConnectionError as e:
+            log.error("Error con el cliente %s: %s", conn.address, e)
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            self.connections.unregister(conn)
+            writer.close()
+            log.info("Cliente %s desconectado", conn.address)
+
+    async def process_request_async(self, request: dict) -> dict:
+        """Procesa en el loop; las acciones bloqueantes van al pool de trabajadores"""
+        action = request.get("action")
+        if not isinstance(action, str) or action not in BLOCKING_ACTIONS:
+            try:
+                return self.process_request(request)
+            except Exception as e:
+                log.exception("Error procesando solicitud")
+                return {"status": "error", "message": f"Error interno: {str(e)}"}
+
+        future = self.pool.submit(request)
+        if future is None:
+            return BUSY_RESPONSE
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            log.exception("Error procesando solicitud")
+            return {"status": "error", "message": f"Error interno: {str(e)}"}
+
+    ########## DESPACHO DE SOLICITUDES ##########
+
+    def _register_actions(self):
+        """Tabla de acciones del protocolo"""
+        self.register_action("login", self._handle_login)
+        self.register_action("resume", self._handle_resume)
+        self.register_action("logout", self._handle_logout)
+        self.register_action("get_profile", self._handle_get_profile)
+        self.register_action("get_photo", self._handle_get_photo)
+        self.register_action("register", self._handle_register)
+        self.register_action("update_profile", self._handle_update_profile)
+        self.register_action("change_password", self._handle_change_password)
+        self.register_action("add_friend", self._handle_add_friend)
+        self.register_action("remove_friend", self._handle_remove_friend)
+        self.register_action("get_friends", self._handle_get_friends)
+        self.register_action("find_path", self._handle_find_path)
+        self.register_action("get_suggestions", self._handle_get_suggestions)
+        self.register_action("search_user", self._handle_search_users)
+        self.register_action("get_stats", self._handle_get_stats)
+        self.register_action("batch", self._handle_batch)
+        self.register_action("get_server_metrics", self._handle_get_server_metrics)
+
+    def register_action(self, action: str, handler: Callable[[dict], dict]):
+        """Asocia una acción con su handler; las métricas se llevan solas"""
+        self.actions[action] = handler
+
     def process_request(self, request: dict) -> dict:
         """Procesa diferentes tipos de solicitudes"""
         action = request.get("action")
-
-        if action == "login":
-            return self._handle_login(request)
-        elif action == "register":
-            return self._handle_register(request)
-        elif action == "update_profile":
-            return self._handle_update_profile(request)
-        elif action == "change_password":
-            return self._handle_change_password(request)
-        elif action == "add_friend":
-            return self._handle_add_friend(request)
-        elif action == "remove_friend":
-            return self._handle_remove_friend(request)
-        elif action == "get_friends":
-            return self._handle_get_friends(request)
-        elif action == "find_path":
-            return self._handle_find_path(request)
-        elif action == "get_suggestions":
-            return self._handle_get_suggestions(request)
-        elif action == "search_user":
-            return self._handle_search_users(request)
-        elif action == "get_stats":
-            return self._handle_get_stats(request)
-        else:
+        handler = self.actions.get(action) if isinstance(action, str) else None
+        if handler is None:
+            self.metrics.add_result("invalid", error=True)
             return {"status": "error", "message": "Acción no válida"}
 
+        token = request.get("token")
+        if token is not None and not isinstance(token, str):
+            self.metrics.add_result(action, error=True)
+            return dict(INVALID_SESSION)
+        if token is not None and action in SESSION_FIELDS:
+            username = self.sessions.resolve(token)
+            if username is None:
+                self.metrics.add_result(action, error=True)
+                return dict(INVALID_SESSION)
+            request = {**request, SESSION_FIELDS[action]: username}
+
+        start = time.perf_counter()
+        try:
+            response = handler(request)
+        except Exception:
+            self.metrics.add_result(action, error=True)
+            raise
+        finally:
+            self.metrics.record(action, "handle", time.perf_counter() - start)
+
+        self.metrics.add_result(action, error=response.get("status") != "success")
+        return response
+
     def _handle_login(self, request: dict) -> dict:
         username = request.get("username")
         password = request.get("password")
         user_data = self.db.get_user(username)
 
-        if user_data and self.auth.verify_password(password, user_data["password_hash"]):
-            return {"status": "success", "user_data": user_data}
+        if not user_data:
+            return {"status": "error", "message": "Credenciales incorrectas"}
+
+        valid, new_hash = self.auth.verify_and_update(password, user_data["password_hash"])
+        if valid:
+            if new_hash is not None:
+                # La política de costo cambió: se guarda el hash con el costo nuevo
+                self.db.update_user(username, password_hash=new_hash)
+            return {
+                "status": "success",
+                "token": self.sessions.create(username),
+                "user_data": public_profile(username, user_data)
+            }
         return {"status": "error", "message": "Credenciales incorrectas"}
 
+    def _handle_resume(self, request: dict) -> dict:
+        """Retoma una sesión tras reconectar, sin volver a calcular pbkdf2"""
+        if request.get("token") is None:
+            return dict(INVALID_SESSION)
+        username = request["username"]
+        user_data = self.db.get_user(username)
+        if not user_data:
+            return {"status": "error", "message": "Usuario no encontrado"}
+        return {"status": "success", "user_data": public_profile(username, user_data)}
+
+    def _handle_logout(self, request: dict) -> dict:
+        if request.get("token") is None or not self.sessions.revoke(request["token"]):
+            return dict(INVALID_SESSION)
+        return {"status": "success", "message": "Sesión cerrada"}
+
+    def _handle_get_profile(self, request: dict) -> dict:
+        """Perfil público con el id de la foto (login no lo envía)"""
+        username = request.get("username")
+        user_data = self.db.get_user(username)
+        if not user_data:
+            return {"status": "error", "message": "Usuario no encontrado"}
+        return {"status": "success", "user_data": public_profile(username, user_data, photo=True)}
+
+    def _handle_get_photo(self, request: dict) -> dict:
+        """Foto por id o por usuario; con if_none_match igual al id responde not_modified
+
+        El id es el sha256 del contenido, así que sirve de ETag: si el cliente
+        ya tiene esa versión no se vuelve a enviar la imagen.
+        """
+        photo_id = request.get("photo_id")
+        if photo_id is None:
+            user_data = self.db.get_user(request.get("username"))
+            if not user_data:
+                return {"status": "error", "message": "Usuario no encontrado"}
+            photo_id = user_data.get("photo", "")
+        if not photo_id:
+            return {"status": "success", "photo_id": "", "photo": ""}
+        if request.get("if_none_match") == photo_id:
+            return {"status": "success", "not_modified": True, "photo_id": photo_id}
+        photo = self.photos.read_base64(photo_id)
+        if photo is None:
+            return {"status": "error", "message": "Foto no encontrada"}
+        return {"status": "success", "photo_id": photo_id, "photo": photo}
+
     def _handle_register(self, request: dict) -> dict:
         username = request.get("username")
         password = request.get("password")
         name = request.get("name")
-        photo = request.get("photo", "")
+        # Antes de guardar la foto: un registro rechazado no debe dejar un blob
+        # huérfano (no se puede borrar después, otro usuario puede compartirlo)
+        if self.db.get_user(username) is not None:
+            return {"status": "error", "message": "Usuario ya existe"}
+        try:
+            photo_id = self.photos.put_base64(request.get("photo", ""))
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
 
-        if self.db.add_user(username, self.auth.hash_password(password), name, photo):
+        if self.db.add_user(username, self.auth.hash_password(password), name, photo_id):
             self.graph.add_user(username)
             return {"status": "success", "message": "Usuario registrado"}
         return {"status": "error", "message": "Usuario ya existe"}
@@ -203,20 +746,23 @@ class SocialtecServer:
         name = request.get("name")
         photo = request.get("photo", None)
 
-        user_data = self.db.get_user(username)
-        if not user_data:
-            return {"status": "error", "message": "Usuario no encontrado"}
-        
+        changes = {}
         # Actualizar nombre
         if name:
-            user_data["name"] = name
+            changes["name"] = name
 
-        # Actualizar foto solo si se proporciona una nueva
+        # Actualizar foto solo si se proporciona una nueva (se guarda su id)
         if photo is not None:
-            user_data["photo"] = photo
+            try:
+                changes["photo"] = self.photos.put_base64(photo)
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
 
-        self.db._save_data()
-        return {"status": "success", "message": "Perfil actualizado", "user_data": user_data}
+        if not self.db.update_user(username, **changes):
+            return {"status": "error", "message": "Usuario no encontrado"}
+        user_data = self.db.get_user(username)
+        return {"status": "success", "message": "Perfil actualizado",
+                "user_data": public_profile(username, user_data, photo=True)}
     
     def _handle_change_password(self, request: dict) -> dict:
         """Cambia la contraseña del usuario"""
@@ -231,8 +777,9 @@ class SocialtecServer:
         if not self.auth.verify_password(old_password, user_data["password_hash"]):
             return {"status": "error", "message": "Contraseña actual incorrecta"}
         
-        user_data["password_hash"] = self.auth.hash_password(new_password)
-        self.db._save_data()
+        self.db.update_user(username, password_hash=self.auth.hash_password(new_password))
+        # Las demás sesiones del usuario dejan de valer
+        self.sessions.revoke_user(username, keep=request.get("token"))
         return {"status": "success", "message": "Contraseña cambiada con éxito"}
 
     def _handle_add_friend(self, request: dict) -> dict:
@@ -262,13 +809,14 @@ class SocialtecServer:
             return {"status": "error", "message": "Usuario no encontrado"}
         
         friends_list = []
+        friends_data = self.db.get_users(user_data.get("friends", []))
         for friend_username in user_data.get("friends", []):
-            friend_data = self.db.get_user(friend_username)
+            friend_data = friends_data.get(friend_username)
             if friend_data:
                 friends_list.append({
                     "name": friend_data.get("name", ""),
                     "username": friend_username,
-                    "photo": friend_data.get("photo", ""),
+                    "photo_id": friend_data.get("photo", ""),
                     "friend_count": len(friend_data.get("friends", []))
                 })
 
@@ -295,36 +843,33 @@ class SocialtecServer:
         suggestions_map = {}
         
         # Algoritmo: Para cada amigo, ver los amigos de ese amigo
-        for friend_username in current_friends:
-            friend_data = self.db.get_user(friend_username)
-            if friend_data:
-                for friend_of_friend in friend_data.get("friends", []):
-                    # No incluir al usuario mismo ni a sus amigos actuales
-                    if friend_of_friend != username and friend_of_friend not in current_friends:
-                        if friend_of_friend not in suggestions_map:
-                            suggestions_map[friend_of_friend] = {
-                                "common_friends": 1,
-                                "data": self.db.get_user(friend_of_friend)
-                            }
-                        else:
-                            suggestions_map[friend_of_friend]["common_friends"] += 1
+        for friend_data in self.db.get_users(current_friends).values():
+            for friend_of_friend in friend_data.get("friends", []):
+                # No incluir al usuario mismo ni a sus amigos actuales
+                if friend_of_friend != username and friend_of_friend not in current_friends:
+                    if friend_of_friend not in suggestions_map:
+                        suggestions_map[friend_of_friend] = {"common_friends": 1}
+                    else:
+                        suggestions_map[friend_of_friend]["common_friends"] += 1
         
         # Ordenar por número de amigos en común (mayor primero)
         sorted_suggestions = sorted(
             suggestions_map.items(),
             key=lambda x: x[1]["common_friends"],
             reverse=True
-        )
+        )[:10]  # Limitar a 10 sugerencias
+        # Solo se traen los datos de las sugerencias que se devuelven
+        suggestions_data = self.db.get_users(name for name, _ in sorted_suggestions)
         
         # Preparar respuesta
         suggestions = []
-        for username_suggestion, info in sorted_suggestions[:10]:  # Limitar a 10 sugerencias
-            user_info = info["data"]
+        for username_suggestion, info in sorted_suggestions:
+            user_info = suggestions_data.get(username_suggestion)
             if user_info:
                 suggestions.append({
                     "name": user_info.get("name", username_suggestion),
                     "username": username_suggestion,
-                    "photo": user_info.get("photo", ""),
+                    "photo_id": user_info.get("photo", ""),
                     "friend_count": len(user_info.get("friends", [])),
                     "common_friends": info["common_friends"]
                 })
@@ -338,9 +883,10 @@ class SocialtecServer:
 
         results = []
         current_user_data = self.db.get_user(current_user)
-        current_friends = current_user_data.get("friends", []) if current_user_data else []
+        # Conjunto: la pertenencia se revisa una vez por candidato
+        current_friends = set(current_user_data.get("friends", ())) if current_user_data else set()
 
-        for username, user_data in self.db.data["users"].items():
+        for username, user_data in self.db.users():
             if username == current_user:
                 continue
 
@@ -349,7 +895,7 @@ class SocialtecServer:
                 results.append({
                     "name": user_data.get("name", ""),
                     "username": username,
-                    "photo": user_data.get("photo", ""),
+                    "photo_id": user_data.get("photo", ""),
                     "friend_count": len(user_data.get("friends", [])),
                     "is_friend": username in current_friends
                 })
@@ -358,4 +904,44 @@ class SocialtecServer:
 
     def _handle_get_stats(self, request: dict) -> dict:
         stats = self.graph.get_statistics()
-        return {"status": "success", "stats": stats}
\ No newline at end of file
+        return {"status": "success", "stats": stats}
+
+    def _handle_batch(self, request: dict) -> dict:
+        """Ejecuta varias acciones en un solo frame, con una sola escritura a disco"""
+        sub_requests = request.get("requests")
+        if not isinstance(sub_requests, list):
+            return {"status": "error", "message": "El batch requiere una lista 'requests'"}
+        if len(sub_requests) > MAX_BATCH_SIZE:
+            return {"status": "error", "message": f"Máximo {MAX_BATCH_SIZE} solicitudes por batch"}
+
+        results = []
+        with self.db.batch():
+            for sub_request in sub_requests:
+                if not isinstance(sub_request, dict) or sub_request.get("action") == "batch":
+                    results.append({"status": "error", "message": "Sub-solicitud inválida"})
+                    continue
+                if "token" in request and "token" not in sub_request:
+                    sub_request = {**sub_request, "token": request["token"]}
+                try:
+                    response = self.process_request(sub_request)
+                except Exception as e:
+                    response = {"status": "error", "message": f"Error interno: {str(e)}"}
+                results.append(with_request_id(response, sub_request.get("id")))
+
+        return {"status": "success", "results": results}
+
+    def _handle_get_server_metrics(self, request: dict) -> dict:
+        """Métricas por acción y estado del pool, hashing, conexiones, sesiones, almacenamiento, locks, fotos y compresión"""
+        return {
+            "status": "success",
+            "actions": self.metrics.snapshot(),
+            "pool": self.pool.stats(),
+            "hashing": self.auth.hasher.stats(),
+            "connections": self.connections.stats(),
+            "sessions": self.sessions.stats(),
+            "storage": self.db.stats(),
+            "graph_lock": self.graph.lock.stats(),
+            "photos": self.photos.stats(),
+            "startup": self.startup,
+            "compression": self.compression_stats.snapshot()
+        }
@@ -0,0 +1,108 @@
+# Sesiones: token opaco -> usuario, en memoria y con expiración
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+TOKEN_BYTES = 24     # 32 caracteres en base64 urlsafe
+PURGE_EVERY = 256    # Limpieza de expirados cada N sesiones creadas
+
+class SessionStore:
+    """Tabla token -> (usuario, expiración) con resolución O(1)
+
+    La expiración se desliza: cada uso válido extiende la sesión por ttl
+    segundos. Los tokens expirados se descartan al resolverlos y en una
+    limpieza periódica al crear sesiones.
+    """
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._sessions: Dict[str, Tuple[str, float]] = {}
+        self._by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.created = 0
+        self.resolved = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def create(self, username: str) -> str:
+        token = secrets.token_urlsafe(TOKEN_BYTES)
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[token] = (username, now + self.ttl)
+            self._by_user.setdefault(username, set()).add(token)
+            self.created += 1
+            if self.created % PURGE_EVERY == 0:
+                self._purge_expired(now)
+        return token
+
+    def resolve(self, token: str) -> Optional[str]:
+        """Usuario dueño del token, o None si no existe, expiró o no es un str"""
+        now = time.monotonic()
+        if not isinstance(token, str):
+            # Viene del cliente: una lista ni siquiera se puede buscar en el dict
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                self.rejected += 1
+                return None
+            username, expires_at = session
+            if expires_at <= now:
+                self._drop(token, username)
+                self.expired += 1
+                self.rejected += 1
+                return None
+            self._sessions[token] = (username, now + self.ttl)
+            self.resolved += 1
+            return username
+
+    def revoke(self, token: str) -> bool:
+        if not isinstance(token, str):
+            return False
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return False
+            self._drop(token, session[0])
+            return True
+
+    def revoke_user(self, username: str, keep: Optional[str] = None) -> int:
+        """Cierra las sesiones del usuario (p. ej. al cambiar la contraseña)"""
+        with self._lock:
+            tokens = [token for token in self._by_user.get(username, ()) if token != keep]
+            for token in tokens:
+                self._drop(token, username)
+            return len(tokens)
+
+    def _drop(self, token: str, username: str):
+        self._sessions.pop(token, None)
+        tokens = self._by_user.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[username]
+
+    def _purge_expired(self, now: float):
+        expired = [(token, username) for token, (username, expires_at) in self._sessions.items()
+                   if expires_at <= now]
+        for token, username in expired:
+            self._drop(token, username)
+        self.expired += len(expired)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "ttl": self.ttl,
+                "created": self.created,
+                "resolved": self.resolved,
+                "rejected": self.rejected,
+                "expired": self.expired
+            }
@@ -0,0 +1,94 @@
+# Reparto de users.json en varios archivos según el hash del username
+import glob
+import json
+import os
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+# users.json con 8 shards: users.000-of-008.json ... users.007-of-008.json
+SHARD_NAME = re.compile(r"\.(\d{3})-of-(\d{3})$")
+MAX_SHARDS = 999
+MAX_WORKERS = 8  # Hilos para leer o escribir shards
+
+def shard_of(username: str, shards: int) -> int:
+    """Shard de un usuario; crc32 porque hash() cambia en cada proceso"""
+    return zlib.crc32(username.encode('utf-8')) % shards
+
+def shard_paths(db_file: str, shards: int) -> List[str]:
+    """Archivos de una distribución; con un solo shard es el mismo db_file"""
+    if shards == 1:
+        return [db_file]
+    root, ext = os.path.splitext(db_file)
+    return [f"{root}.{index:03d}-of-{shards:03d}{ext}" for index in range(shards)]
+
+def find_layouts(db_file: str) -> List[int]:
+    """Cantidades de shards que tienen todos sus archivos en disco"""
+    layouts = [1] if os.path.exists(db_file) else []
+    root, ext = os.path.splitext(db_file)
+    found = {}
+    for path in glob.glob(f"{glob.escape(root)}.*-of-*{glob.escape(ext)}"):
+        match = SHARD_NAME.search(path[:len(path) - len(ext)])
+        if match:
+            shards = int(match.group(2))
+            found[shards] = found.get(shards, 0) + 1
+    layouts.extend(sorted(shards for shards, count in found.items() if shards > 1 and count == shards))
+    return layouts
+
+def _read_json(path: str) -> Dict[str, Dict]:
+    with open(path, 'r') as f:
+        return json.load(f)["users"]
+
+def read_shards(paths: List[str]) -> Dict[str, Dict]:
+    """Usuarios de todos los shards en orden de shard, leídos con un pool de hilos
+
+    Los hilos solapan la lectura de los archivos; el parseo de cada JSON
+    sigue tomando el GIL.
+    """
+    if len(paths) == 1:
+        return _read_json(paths[0])
+    users = {}
+    with ThreadPoolExecutor(max_workers=min(len(paths), MAX_WORKERS),
+                            thread_name_prefix="socialtec-shards") as pool:
+        for part in pool.map(_read_json, paths):
+            users.update(part)
+    return users
+
+def write_users_json(path: str, users: Iterable[Tuple[str, Mapping]], fsync: bool = True):
+    """Escribe un users.json de a un usuario (archivo temporal + rename)"""
+    temp_file = path + ".tmp"
+    with open(temp_file, 'w') as f:
+        f.write('{"users": {')
+        for position, (username, record) in enumerate(users):
+            if position:
+                f.write(", ")
+            f.write(f"{json.dumps(username)}: {json.dumps(dict(record))}")
+        f.write("}}")
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(temp_file, path)
+
+def write_shards(db_file: str, shards: int, users: Mapping[str, Mapping],
+                 only: Optional[Iterable[int]] = None):
+    """Escribe los shards indicados (todos si only es None) a partir de users"""
+    paths = shard_paths(db_file, shards)
+    if shards == 1:
+        write_users_json(db_file, users.items())
+        return
+    buckets = {index: [] for index in (range(shards) if only is None else only)}
+    for username in users:
+        bucket = buckets.get(shard_of(username, shards))
+        if bucket is not None:
+            bucket.append(username)
+    if not buckets:
+        return
+
+    def write(index: int):
+        write_users_json(paths[index], ((username, users[username]) for username in buckets[index]))
+
+    with ThreadPoolExecutor(max_workers=min(len(buckets), MAX_WORKERS),
+                            thread_name_prefix="socialtec-shards") as pool:
+        # list() propaga el primer error de escritura
+        list(pool.map(write, buckets))
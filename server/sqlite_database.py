@@ -0,0 +1,214 @@
+# Backend SQLite para usuarios y amistades (misma interfaz que UserDataBase)
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+# Campos del usuario que se pueden cambiar con update_user; "photo" guarda
+# el id del blob en blob_store.py, no la imagen
+USER_FIELDS = ("name", "photo", "password_hash")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username      TEXT PRIMARY KEY,
+    name          TEXT NOT NULL,
+    photo         TEXT NOT NULL DEFAULT '',
+    password_hash TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(name);
+-- Cada amistad se guarda en ambas direcciones; la PK indexa por usuario
+CREATE TABLE IF NOT EXISTS friendships (
+    user   TEXT NOT NULL,
+    friend TEXT NOT NULL,
+    PRIMARY KEY (user, friend)
+) WITHOUT ROWID;
+"""
+
+# Sentencias fijas: sqlite3 las prepara una vez y las reutiliza de su caché
+SQL_INSERT_USER = "INSERT OR IGNORE INTO users (username, name, photo, password_hash) VALUES (?, ?, ?, ?)"
+SQL_GET_USER = "SELECT name, photo, password_hash FROM users WHERE username = ?"
+SQL_GET_FRIENDS = "SELECT friend FROM friendships WHERE user = ?"
+# Usernames por consulta en get_users (cada uno es un parámetro del IN)
+GET_USERS_CHUNK = 500
+SQL_COUNT_EXISTING = "SELECT COUNT(*) FROM users WHERE username IN (?, ?)"
+SQL_INSERT_FRIEND = "INSERT OR IGNORE INTO friendships (user, friend) VALUES (?, ?)"
+SQL_DELETE_FRIEND = "DELETE FROM friendships WHERE user = ? AND friend = ?"
+SQL_ALL_USERS = "SELECT username, name, photo, password_hash FROM users ORDER BY username"
+SQL_ALL_FRIENDS = "SELECT user, friend FROM friendships ORDER BY user"
+
+class SqliteUserDataBase:
+    """Backend SQLite en modo WAL: cada cambio escribe solo las filas tocadas
+
+    Una conexión compartida con un lock para las operaciones; users() abre
+    una conexión de lectura propia para recorrer sin bloquear las demás.
+    """
+    def __init__(self, db_file: str = "users.db"):
+        # Ruta absoluta: users() abre conexiones nuevas aunque cambie el cwd
+        self.db_file = os.path.abspath(db_file)
+        self._lock = threading.RLock()
+        self._batch_depth = 0  # Solo lo usa el hilo que tiene el lock (ver batch)
+        start = time.perf_counter()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        self.load_times = {"open": time.perf_counter() - start}
+        self.loaded_from = "sqlite"
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: las transacciones se abren explícitamente
+        conn = sqlite3.connect(self.db_file, isolation_level=None,
+                               check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Transacción propia, o la del batch abierto si lo hay"""
+        with self._lock:
+            if self._batch_depth:
+                yield self._conn
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @contextmanager
+    def batch(self):
+        """Agrupa varias mutaciones de este hilo en una sola transacción
+
+        El lock queda tomado hasta el cierre: la conexión es compartida, así
+        que otro hilo que escribiera en medio quedaría dentro de la
+        transacción del batch. Si sale una excepción se deshace el batch.
+        """
+        with self._lock:
+            outer = self._batch_depth == 0
+            if outer:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if outer:
+                    self._conn.execute("ROLLBACK")
+                    self._count = self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+                raise
+            self._batch_depth -= 1
+            if outer:
+                self._conn.execute("COMMIT")
+
+    def add_user(self, username: str, password_hash: str, name: str, photo: str = ""):
+        with self._write() as conn:
+            added = conn.execute(SQL_INSERT_USER, (username, name, photo, password_hash)).rowcount == 1
+            if added:
+                self._count += 1
+        return added
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        """Copia de los datos del usuario; los cambios se hacen con update_user"""
+        with self._lock:
+            row = self._conn.execute(SQL_GET_USER, (username,)).fetchone()
+            if row is None:
+                return None
+            friends = [friend for (friend,) in self._conn.execute(SQL_GET_FRIENDS, (username,))]
+        return {"name": row[0], "photo": row[1], "password_hash": row[2], "friends": friends}
+
+    def get_users(self, usernames) -> Dict[str, Dict]:
+        """Varios usuarios con dos consultas por tanda (los que no existen se omiten)"""
+        usernames = list(dict.fromkeys(usernames))
+        users = {}
+        with self._lock:
+            for start in range(0, len(usernames), GET_USERS_CHUNK):
+                chunk = usernames[start:start + GET_USERS_CHUNK]
+                marks = ", ".join("?" * len(chunk))
+                for username, name, photo, password_hash in self._conn.execute(
+                        f"SELECT username, name, photo, password_hash FROM users WHERE username IN ({marks})", chunk):
+                    users[username] = {"name": name, "photo": photo,
+                                       "password_hash": password_hash, "friends": []}
+                for user, friend in self._conn.execute(
+                        f"SELECT user, friend FROM friendships WHERE user IN ({marks})", chunk):
+                    if user in users:
+                        users[user]["friends"].append(friend)
+        return users
+
+    def update_user(self, username: str, **fields) -> bool:
+        """Cambia nombre, foto o hash de contraseña"""
+        columns = [field for field in USER_FIELDS if field in fields]
+        if not columns:
+            return self.get_user(username) is not None
+        sql = f"UPDATE users SET {', '.join(f'{column} = ?' for column in columns)} WHERE username = ?"
+        with self._write() as conn:
+            return conn.execute(sql, [fields[column] for column in columns] + [username]).rowcount == 1
+
+    def _both_exist(self, conn: sqlite3.Connection, user1: str, user2: str) -> bool:
+        expected = 1 if user1 == user2 else 2
+        return conn.execute(SQL_COUNT_EXISTING, (user1, user2)).fetchone()[0] == expected
+
+    def add_friend(self, user1: str, user2: str):
+        with self._write() as conn:
+            if not self._both_exist(conn, user1, user2):
+                return False
+            conn.executemany(SQL_INSERT_FRIEND, ((user1, user2), (user2, user1)))
+        return True
+
+    def remove_friend(self, user1: str, user2: str):
+        with self._write() as conn:
+            if not self._both_exist(conn, user1, user2):
+                return False
+            conn.executemany(SQL_DELETE_FRIEND, ((user1, user2), (user2, user1)))
+        return True
+
+    def users(self) -> Iterator[Tuple[str, Dict]]:
+        """Recorre (username, datos) de todos los usuarios
+
+        Une las dos tablas ordenadas por usuario en una sola pasada, sobre
+        una conexión de lectura propia (WAL permite leer mientras se escribe).
+        """
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        try:
+            conn.execute("BEGIN")  # Misma instantánea para ambas consultas
+            friend_rows = conn.execute(SQL_ALL_FRIENDS)
+            pending = next(friend_rows, None)
+            for username, name, photo, password_hash in conn.execute(SQL_ALL_USERS):
+                friends = []
+                while pending is not None and pending[0] <= username:
+                    if pending[0] == username:
+                        friends.append(pending[1])
+                    pending = next(friend_rows, None)
+                yield username, {"name": name, "photo": photo,
+                                 "password_hash": password_hash, "friends": friends}
+        finally:
+            conn.close()
+
+    def import_users(self, users: Mapping[str, Mapping]) -> int:
+        """Carga masiva (migración desde users.json) en una sola transacción"""
+        with self._write() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            conn.executemany(SQL_INSERT_USER, (
+                (username, data.get("name", ""), data.get("photo", ""), data.get("password_hash", ""))
+                for username, data in users.items()
+            ))
+            conn.executemany(SQL_INSERT_FRIEND, (
+                (username, friend)
+                for username, data in users.items()
+                for friend in data.get("friends", []) if friend in users
+            ))
+            self._count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        return self._count - before
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict:
+        return {"backend": "sqlite", "users": self._count}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
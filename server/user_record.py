@@ -0,0 +1,115 @@
+# Registro compacto de un usuario en memoria
+import gc
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Campos de texto de un usuario, en el orden de los snapshots
+FIELDS = ("name", "photo", "password_hash")
+# Con más amigos que esto la lista pasa de array('I') a dict {id: None}:
+# pertenencia y borrado O(1) para los pocos usuarios con miles de amigos
+HUB_DEGREE = 256
+
+@contextmanager
+def paused_gc():
+    """Carga masiva de registros: se crean cientos de miles de objetos que viven
+    todo el proceso, así que el GC cíclico no tiene nada que recolectar y solo
+    retrasaría la carga"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+class UserRecord:
+    """Datos de un usuario sin un dict por registro
+
+    id es la posición del usuario en la tabla de usernames de la base y
+    los amigos se guardan como ids: 4 bytes por amistad en vez de una
+    referencia a un str más la entrada de un dict. epoch es la versión de
+    la base en que se creó el registro; la base lo copia antes de cambiarlo
+    si una vista inmutable puede estar usándolo.
+    """
+    __slots__ = ("id", "name", "photo", "password_hash", "friends", "epoch")
+
+    def __init__(self, user_id: int, name: str, photo: str, password_hash: str,
+                 friends=None, epoch: int = 0):
+        self.id = user_id
+        self.name = name
+        self.photo = photo
+        self.password_hash = password_hash
+        if friends is None:
+            friends = array('I')
+        elif len(friends) > HUB_DEGREE and not isinstance(friends, dict):
+            friends = dict.fromkeys(friends)
+        self.friends = friends
+        self.epoch = epoch
+
+    def add_friend(self, friend_id: int):
+        friends = self.friends
+        if friend_id in friends:
+            return
+        if isinstance(friends, dict):
+            friends[friend_id] = None
+            return
+        friends.append(friend_id)
+        if len(friends) > HUB_DEGREE:
+            self.friends = dict.fromkeys(friends)
+
+    def remove_friend(self, friend_id: int):
+        friends = self.friends
+        if isinstance(friends, dict):
+            friends.pop(friend_id, None)
+        elif friend_id in friends:
+            friends.remove(friend_id)
+
+    def copy(self, epoch: int) -> "UserRecord":
+        friends = self.friends.copy() if isinstance(self.friends, dict) else array('I', self.friends)
+        return UserRecord(self.id, self.name, self.photo, self.password_hash, friends, epoch)
+
+    def to_dict(self, names: List[str]) -> Dict:
+        """Datos como dict (amigos como lista de usernames), como los usan los handlers"""
+        return {"name": self.name, "photo": self.photo, "password_hash": self.password_hash,
+                "friends": list(map(names.__getitem__, self.friends))}
+
+class UserView(Mapping):
+    """Registro visto como mapping de solo lectura (amigos como tupla de usernames)"""
+    __slots__ = ("_record", "_names")
+
+    def __init__(self, record: UserRecord, names: List[str]):
+        self._record = record
+        self._names = names
+
+    def __getitem__(self, key: str):
+        if key == "friends":
+            return tuple(map(self._names.__getitem__, self._record.friends))
+        if key in FIELDS:
+            return getattr(self._record, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(FIELDS + ("friends",))
+
+    def __len__(self) -> int:
+        return len(FIELDS) + 1
+
+class RecordsView(Mapping):
+    """{username: UserView} sobre una copia del dict de registros"""
+    def __init__(self, records: Dict[str, UserRecord], names: List[str]):
+        self._records = records
+        self._names = names
+
+    def __getitem__(self, username: str) -> UserView:
+        return UserView(self._records[username], self._names)
+
+    def __contains__(self, username) -> bool:
+        return username in self._records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,98 @@
+# Pool de trabajadores con cola de admisión acotada
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+# Respuesta rápida cuando la cola de admisión está llena
+BUSY_RESPONSE = {
+    "status": "busy",
+    "message": "Servidor ocupado, intenta más tarde",
+    "retry_after": 0.5
+}
+
+class WorkerPool:
+    """Número fijo de hilos que atienden solicitudes desde una cola acotada"""
+    def __init__(self, handler: Callable[[dict], dict], workers: int = 8, queue_size: int = 128):
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.processed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        """Arranca los hilos trabajadores"""
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"socialtec-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Detiene los trabajadores cuando terminan lo que ya está en cola
+
+        Con timeout espera hasta ese tiempo a que terminen (para cerrar la
+        base después de la última mutación).
+        """
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            self.queue.put(None)
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            for thread in threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+
+    def submit(self, request: dict) -> Optional[Future]:
+        """Encola una solicitud; retorna None si la cola está llena"""
+        future = Future()
+        try:
+            self.queue.put_nowait((request, future, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return None
+        return future
+
+    def _worker_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            request, future, enqueued_at = item
+            wait = time.monotonic() - enqueued_at
+            with self._lock:
+                self.processed += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.handler(request))
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self) -> dict:
+        """Profundidad de la cola, tiempos de espera y rechazos"""
+        with self._lock:
+            avg_wait = self.total_wait / self.processed if self.processed else 0.0
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "processed": self.processed,
+                "rejected": self.rejected,
+                "avg_wait_ms": avg_wait * 1000,
+                "max_wait_ms": self.max_wait * 1000
+            }
@@ -0,0 +1 @@
+# Código compartido entre cliente y servidor
@@ -0,0 +1,84 @@
+# Cifrado de los frames: Fernet (compatibilidad) o AES-GCM por sesión
+import base64
+import os
+import threading
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# Cifrados que se pueden negociar por conexión
+CIPHERS = ("fernet", "aesgcm")
+
+SESSION_NONCE_SIZE = 16  # Aporte aleatorio de cada extremo a la clave de sesión
+COUNTER_SIZE = 8
+
+class CipherError(ValueError):
+    """Frame que no se pudo autenticar/desencriptar"""
+
+class FernetCipher:
+    """Tokens Fernet (base64 urlsafe); sin estado, seguro entre hilos"""
+    name = "fernet"
+
+    def __init__(self, key: bytes):
+        self._fernet = Fernet(key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(bytes(data))
+
+    def decrypt(self, token) -> bytes:
+        return self._fernet.decrypt(bytes(token))
+
+class AesGcmSession:
+    """AES-GCM sobre bytes crudos con nonces manejados por conexión
+
+    Cada frame es: contador (8 bytes) + texto cifrado + tag (16 bytes). El
+    nonce es un prefijo por dirección + el contador, así que nunca se repite
+    con la misma clave; el receptor exige contadores consecutivos, lo que
+    también rechaza frames repetidos o reordenados. encrypt() debe llamarse
+    en el mismo orden en que se envían los frames (bajo el lock de envío).
+    """
+    name = "aesgcm"
+
+    def __init__(self, key: bytes, is_server: bool):
+        self._aead = AESGCM(key)
+        self._send_prefix = b"SRV\x00" if is_server else b"CLI\x00"
+        self._recv_prefix = b"CLI\x00" if is_server else b"SRV\x00"
+        self._send_counter = 0
+        self._recv_counter = 0
+        self._lock = threading.Lock()
+
+    def encrypt(self, data: bytes) -> bytes:
+        with self._lock:
+            counter = self._send_counter.to_bytes(COUNTER_SIZE, 'big')
+            self._send_counter += 1
+        return counter + self._aead.encrypt(self._send_prefix + counter, data, None)
+
+    def decrypt(self, frame) -> bytes:
+        view = memoryview(frame)
+        counter = bytes(view[:COUNTER_SIZE])
+        if int.from_bytes(counter, 'big') != self._recv_counter:
+            raise CipherError("Frame fuera de secuencia")
+        try:
+            data = self._aead.decrypt(self._recv_prefix + counter, view[COUNTER_SIZE:], None)
+        except Exception as e:
+            raise CipherError("Frame no auténtico") from e
+        self._recv_counter += 1
+        return data
+
+def new_session_nonce() -> str:
+    """Aporte aleatorio para la clave de sesión, listo para ir en JSON"""
+    return base64.b64encode(os.urandom(SESSION_NONCE_SIZE)).decode()
+
+def derive_session_key(shared_key: bytes, client_nonce: str, server_nonce: str) -> bytes:
+    """Clave AES-256 de la conexión, derivada con HKDF de la clave compartida"""
+    salt = base64.b64decode(client_nonce, validate=True) + base64.b64decode(server_nonce, validate=True)
+    if len(salt) != 2 * SESSION_NONCE_SIZE:
+        raise CipherError("Nonce de sesión inválido")
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        info=b"socialtec-aesgcm-session"
+    ).derive(base64.urlsafe_b64decode(shared_key))
@@ -0,0 +1,79 @@
+# Compresión opcional del mensaje antes de encriptarlo
+import threading
+import time
+import zlib
+from typing import Dict
+from .framing import MAX_FRAME
+
+# Algoritmos que se pueden negociar por conexión
+COMPRESSIONS = ("zlib",)
+
+# Primer byte del mensaje (ya desencriptado) cuando la compresión está activa
+FLAG_RAW = 0x00
+FLAG_ZLIB = 0x01
+
+# Mensajes más pequeños que esto no se comprimen
+DEFAULT_THRESHOLD = 1024
+# Nivel 1: las fotos ya vienen comprimidas (JPEG en base64), niveles más altos
+# gastan bastante más CPU para ganar muy poco
+DEFAULT_LEVEL = 1
+
+def compress_payload(data: bytes, threshold: int = DEFAULT_THRESHOLD, level: int = DEFAULT_LEVEL) -> bytes:
+    """Agrega el byte de bandera y comprime si vale la pena"""
+    if len(data) >= threshold:
+        compressed = zlib.compress(data, level)
+        if len(compressed) < len(data):
+            return bytes((FLAG_ZLIB,)) + compressed
+    return bytes((FLAG_RAW,)) + data
+
+def decompress_payload(data: bytes) -> bytes:
+    """Inverso de compress_payload"""
+    if not data:
+        raise ValueError("Mensaje vacío")
+    flag = data[0]
+    if flag == FLAG_RAW:
+        return data[1:]
+    if flag == FLAG_ZLIB:
+        # Acotado a MAX_FRAME: unos KB comprimidos pueden expandirse a cientos de MB
+        decompressor = zlib.decompressobj()
+        payload = decompressor.decompress(memoryview(data)[1:], MAX_FRAME)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"El mensaje descomprimido supera {MAX_FRAME} bytes")
+        if not decompressor.eof:
+            raise ValueError("Mensaje comprimido incompleto")
+        return payload
+    raise ValueError(f"Bandera de compresión desconocida: {flag}")
+
+class CompressionStats:
+    """Acumula tasa de compresión y tiempo de CPU por acción"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._actions: Dict[str, Dict] = {}
+
+    def compress(self, action: str, data: bytes, threshold: int = DEFAULT_THRESHOLD) -> bytes:
+        """compress_payload midiendo el costo para la acción dada"""
+        start = time.thread_time()
+        payload = compress_payload(data, threshold)
+        cpu = time.thread_time() - start
+
+        with self._lock:
+            entry = self._actions.setdefault(action or "?", {
+                "frames": 0, "compressed_frames": 0,
+                "raw_bytes": 0, "wire_bytes": 0, "cpu_seconds": 0.0
+            })
+            entry["frames"] += 1
+            entry["compressed_frames"] += payload[0] == FLAG_ZLIB
+            entry["raw_bytes"] += len(data)
+            entry["wire_bytes"] += len(payload)
+            entry["cpu_seconds"] += cpu
+        return payload
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Estadísticas por acción, con la tasa (raw/wire) y CPU promedio"""
+        with self._lock:
+            report = {}
+            for action, entry in self._actions.items():
+                report[action] = dict(entry)
+                report[action]["ratio"] = entry["raw_bytes"] / entry["wire_bytes"] if entry["wire_bytes"] else 1.0
+                report[action]["cpu_ms_per_frame"] = entry["cpu_seconds"] * 1000 / entry["frames"]
+            return report
@@ -0,0 +1,117 @@
+# Protocolo de longitud: 4 bytes big-endian + mensaje
+import socket
+import struct
+from typing import Optional
+
+HEADER = struct.Struct(">I")
+
+# Tamaño de lectura adaptativo: empieza en MIN_CHUNK y se duplica cada vez
+# que el kernel llena la lectura completa, hasta MAX_CHUNK
+MIN_CHUNK = 64 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+
+# Por debajo de este tamaño es más barato copiar cabecera + mensaje en un
+# solo buffer que hacer un envío con varios buffers
+SMALL_FRAME = 64 * 1024
+
+# Frame más grande que se acepta. La longitud viene del otro extremo antes
+# de autenticar nada: sin este límite una cabecera bastaría para que el
+# receptor reserve hasta 4 GiB
+MAX_FRAME = 64 * 1024 * 1024
+
+class IncompleteFrameError(ConnectionError):
+    """La conexión se cerró a mitad de un frame"""
+    def __init__(self, received: int, expected: int):
+        super().__init__(f"Mensaje incompleto: {received}/{expected} bytes")
+        self.received = received
+        self.expected = expected
+
+class FrameTooLargeError(ConnectionError):
+    """La cabecera anuncia un frame mayor que MAX_FRAME"""
+    def __init__(self, length: int):
+        super().__init__(f"Mensaje demasiado grande: {length} bytes (máximo {MAX_FRAME})")
+        self.length = length
+
+def check_frame_length(length: int) -> int:
+    """Retorna length, o lanza FrameTooLargeError si supera MAX_FRAME"""
+    if length > MAX_FRAME:
+        raise FrameTooLargeError(length)
+    return length
+
+def frame_header(length: int) -> bytes:
+    """Cabecera de 4 bytes con la longitud del mensaje"""
+    return HEADER.pack(length)
+
+def recv_into_exact(sock: socket.socket, view: memoryview) -> int:
+    """Llena view desde el socket; retorna los bytes leídos (menos si hay EOF)"""
+    total = len(view)
+    read = 0
+    chunk = MIN_CHUNK
+    while read < total:
+        wanted = min(chunk, total - read)
+        n = sock.recv_into(view[read:], wanted)
+        if n == 0:
+            break
+        read += n
+        if n == wanted and chunk < MAX_CHUNK:
+            chunk *= 2
+    return read
+
+def _recv_header(sock: socket.socket) -> Optional[int]:
+    """Lee la cabecera de longitud; None si hubo EOF antes de empezarla"""
+    header = sock.recv(HEADER.size)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        rest = bytearray(HEADER.size - len(header))
+        read = recv_into_exact(sock, memoryview(rest))
+        if read < len(rest):
+            raise IncompleteFrameError(len(header) + read, HEADER.size)
+        header += rest
+    return check_frame_length(HEADER.unpack(header)[0])
+
+def recv_frame(sock: socket.socket) -> Optional[bytes]:
+    """Recibe un frame completo
+
+    Los frames pequeños que llegan en una sola lectura se retornan tal cual
+    (bytes); el resto se arma en un bytearray preasignado con recv_into, sin
+    copias intermedias. Retorna None si el otro extremo cerró la conexión
+    limpiamente entre frames, lanza IncompleteFrameError si la cerró a
+    mitad de uno y FrameTooLargeError si la cabecera supera MAX_FRAME.
+    """
+    length = _recv_header(sock)
+    if length is None:
+        return None
+
+    first = b""
+    if length <= SMALL_FRAME:
+        first = sock.recv(length)
+        if len(first) == length:
+            return first
+        if not first:
+            raise IncompleteFrameError(0, length)
+
+    buffer = bytearray(length)
+    buffer[:len(first)] = first
+    read = len(first) + recv_into_exact(sock, memoryview(buffer)[len(first):])
+    if read < length:
+        raise IncompleteFrameError(read, length)
+    return buffer
+
+def send_frame(sock: socket.socket, payload: bytes):
+    """Envía cabecera + mensaje sin copiar mensajes grandes"""
+    header = frame_header(len(payload))
+    if len(payload) <= SMALL_FRAME or not hasattr(sock, "sendmsg"):
+        sock.sendall(header + payload)
+        return
+
+    buffers = [memoryview(header), memoryview(payload)]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        while sent:
+            if sent >= len(buffers[0]):
+                sent -= len(buffers[0])
+                buffers.pop(0)
+            else:
+                buffers[0] = buffers[0][sent:]
+                sent = 0
@@ -0,0 +1,82 @@
+# Logging asíncrono: los registros pasan por una cola a un hilo escritor
+import atexit
+import itertools
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+ROOT_LOGGER = "socialtec"
+FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(threadName)s] %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger bajo la jerarquía socialtec (p. ej. "server.frames")"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+class FrameSampler(logging.Filter):
+    """Deja pasar 1 de cada N registros DEBUG de los loggers *.frames
+
+    Corre en el hilo que hace el log, antes de encolar, así que los
+    registros descartados no cuestan ni la cola ni el formateo.
+    """
+    def __init__(self, every: int = 100):
+        super().__init__()
+        self.every = max(1, every)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or not record.name.endswith(".frames"):
+            return True
+        return next(self._counter) % self.every == 0
+
+def setup_logging(level: str = "INFO", module_levels: Optional[Dict[str, str]] = None,
+                  frame_sample_every: int = 100, stream=None) -> QueueListener:
+    """Configura la jerarquía socialtec con un escritor en segundo plano
+
+    module_levels permite niveles por módulo, p. ej. {"server.frames": "DEBUG"}.
+    Los loggers con nivel deshabilitado descartan el registro en la llamada
+    misma (sin formatear ni encolar).
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(FrameSampler(frame_sample_every))
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level.upper())
+    root.propagate = False
+    for name, module_level in (module_levels or {}).items():
+        get_logger(name).setLevel(module_level.upper())
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(logging.Formatter(FORMAT))
+    _listener = QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+@atexit.register
+def _flush_on_exit():
+    """Vacía la cola pendiente al terminar el proceso"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        # Lo que se registre después (p. ej. desde __del__) ya no tiene escritor
+        logging.getLogger(ROOT_LOGGER).handlers[:] = [logging.NullHandler()]
+
+def parse_module_levels(values) -> Dict[str, str]:
+    """Convierte ["server.frames=DEBUG", ...] en {"server.frames": "DEBUG"}"""
+    levels = {}
+    for value in values or []:
+        name, _, level = value.partition("=")
+        if not level:
+            raise ValueError(f"Formato esperado modulo=NIVEL: {value}")
+        levels[name.strip()] = level.strip()
+    return levels
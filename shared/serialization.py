@@ -0,0 +1,183 @@
+# Codecs de serialización de mensajes (antes de comprimir/encriptar)
+import json
+import marshal
+import struct
+from typing import Any
+
+class JsonCodec:
+    """Formato por defecto, legible y compatible con cualquier cliente"""
+    name = "json"
+
+    def encode(self, message: Any) -> bytes:
+        return json.dumps(message).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+# Subconjunto del formato de marshal que produce un mensaje: None, bool,
+# int, float, str, list/tuple y dict. FLAG_REF marca objetos a los que se
+# puede volver a apuntar con "r" (posición en la lista de referencias)
+FLAG_REF = 0x80
+INT32 = struct.Struct("<i")
+FLOAT = struct.Struct("<d")
+# Tipos de marshal (los mismos nombres que en Python/marshal.c)
+TYPE_NONE = ord("N")
+TYPE_TRUE = ord("T")
+TYPE_FALSE = ord("F")
+TYPE_INT = ord("i")
+TYPE_LONG = ord("l")
+TYPE_BINARY_FLOAT = ord("g")
+TYPE_UNICODE = ord("u")
+TYPE_INTERNED = ord("t")
+TYPE_ASCII = ord("a")
+TYPE_ASCII_INTERNED = ord("A")
+TYPE_SHORT_ASCII = ord("z")
+TYPE_SHORT_ASCII_INTERNED = ord("Z")
+TYPE_LIST = ord("[")
+TYPE_TUPLE = ord("(")
+TYPE_SMALL_TUPLE = ord(")")
+TYPE_DICT = ord("{")
+TYPE_REF = ord("r")
+CONTAINERS = {TYPE_LIST, TYPE_TUPLE, TYPE_SMALL_TUPLE, TYPE_DICT}
+MAX_DEPTH = 100        # Anidamiento máximo de listas y dicts
+MAX_LONG_DIGITS = 300  # Dígitos de 15 bits de un int grande (unos 4500 bits)
+
+class _MarshalReader:
+    """Lee el subconjunto de marshal sin llamar a marshal.loads
+
+    Cualquier otro tipo (code, bytes, set...) es un error. Las cantidades
+    se validan contra los bytes que quedan antes de reservar nada.
+    """
+    def __init__(self, data: bytes):
+        self.data = bytes(data)
+        self.pos = 0
+        self.refs = []
+
+    def _take(self, size: int) -> bytes:
+        start = self.pos
+        end = start + size
+        if size < 0 or end > len(self.data):
+            raise ValueError("Mensaje marshal incompleto")
+        self.pos = end
+        return self.data[start:end]
+
+    def _int32(self) -> int:
+        return INT32.unpack(self._take(4))[0]
+
+    def _count(self, size: int) -> int:
+        """Cantidad de elementos; cada uno ocupa al menos un byte"""
+        if size < 0 or size > len(self.data) - self.pos:
+            raise ValueError("Cantidad de elementos inválida")
+        return size
+
+    def read(self, depth: int = 0) -> Any:
+        if depth > MAX_DEPTH:
+            raise ValueError("Mensaje marshal demasiado anidado")
+        data = self.data
+        if self.pos >= len(data):
+            raise ValueError("Mensaje marshal incompleto")
+        code = data[self.pos]
+        self.pos += 1
+        flag = code & FLAG_REF
+        tag = code & ~FLAG_REF
+
+        # Los más frecuentes primero: textos cortos y enteros
+        if tag == TYPE_SHORT_ASCII or tag == TYPE_SHORT_ASCII_INTERNED:
+            if self.pos >= len(data):
+                raise ValueError("Mensaje marshal incompleto")
+            size = data[self.pos]
+            self.pos += 1
+            value = self._take(size).decode("latin-1")
+        elif tag == TYPE_INT:
+            value = INT32.unpack(self._take(4))[0]
+        elif tag == TYPE_UNICODE or tag == TYPE_INTERNED:
+            value = self._take(self._int32()).decode("utf-8", "surrogatepass")
+        elif tag == TYPE_ASCII or tag == TYPE_ASCII_INTERNED:
+            value = self._take(self._int32()).decode("latin-1")
+        elif tag == TYPE_NONE:
+            return None
+        elif tag == TYPE_TRUE:
+            return True
+        elif tag == TYPE_FALSE:
+            return False
+        elif tag == TYPE_REF:
+            index = self._int32()
+            if not 0 <= index < len(self.refs) or self.refs[index] is None:
+                raise ValueError("Referencia marshal inválida")
+            return self.refs[index]
+        elif tag in CONTAINERS:
+            return self._container(tag, flag, depth)
+        elif tag == TYPE_BINARY_FLOAT:
+            value = FLOAT.unpack(self._take(8))[0]
+        elif tag == TYPE_LONG:
+            value = self._long()
+        else:
+            raise ValueError(f"Tipo marshal no permitido: {chr(tag)!r}")
+        if flag:
+            self.refs.append(value)
+        return value
+
+    def _container(self, tag: int, flag: int, depth: int):
+        # El contenedor se registra antes que su contenido
+        value = {} if tag == TYPE_DICT else []
+        if flag:
+            self.refs.append(value)
+        read = self.read
+        if tag == TYPE_DICT:
+            data = self.data
+            while True:
+                if data[self.pos:self.pos + 1] == b"0":
+                    self.pos += 1
+                    return value
+                key = read(depth + 1)
+                if isinstance(key, (list, dict)):
+                    raise ValueError("Clave de dict inválida")
+                value[key] = read(depth + 1)
+        size = self._take(1)[0] if tag == TYPE_SMALL_TUPLE else self._int32()
+        append = value.append
+        for _ in range(self._count(size)):
+            append(read(depth + 1))
+        return value  # Las tuplas se entregan como listas, igual que JSON
+
+    def _long(self) -> int:
+        size = self._int32()
+        digits = abs(size)
+        if digits > MAX_LONG_DIGITS:
+            raise ValueError("Entero demasiado grande")
+        raw = self._take(2 * digits)
+        value = 0
+        for position in range(digits - 1, -1, -1):
+            value = (value << 15) | (raw[2 * position] | raw[2 * position + 1] << 8)
+        return -value if size < 0 else value
+
+class MarshalCodec:
+    """Formato binario compacto de la librería estándar
+
+    Codifica con marshal (en C, rápido para las respuestas del servidor).
+    No decodifica con marshal.loads: la clave compartida la tiene cada
+    cliente, así que el cifrado no garantiza que los bytes sean
+    confiables, y marshal.loads no es seguro ante datos maliciosos. Se lee
+    con _MarshalReader, que solo arma dict, list, str, int, float, bool y None.
+    """
+    name = "marshal"
+    version = 4
+
+    def encode(self, message: Any) -> bytes:
+        return marshal.dumps(message, self.version)
+
+    def decode(self, data: bytes) -> Any:
+        reader = _MarshalReader(data)
+        message = reader.read()
+        if reader.pos != len(reader.data):
+            raise ValueError("Bytes sobrantes después del mensaje marshal")
+        return message
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), MarshalCodec())}
+DEFAULT_CODEC = CODECS["json"]
+
+def get_codec(name: str):
+    """Retorna el codec registrado con ese nombre o lanza ValueError"""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Codec no soportado: {name}") from None
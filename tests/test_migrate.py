@@ -0,0 +1,71 @@
+"""
+Migración a SQLite: migrate_to_sqlite lleva lo que todavía está solo en
+el log (sin compactar) y lee bases repartidas en shards.
+
+Uso: python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+sys.path.insert(0, SERVER_DIR)
+from config import load_config
+from database import LOG_SUFFIX, UserDataBase
+from migrate_to_sqlite import migrate
+from sqlite_database import SqliteUserDataBase
+
+class MigrateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp.name, "users.json")
+        self.sqlite_path = os.path.join(self.tmp.name, "users.db")
+        self.storage = load_config(os.path.join(self.tmp.name, "missing.json"))["storage"]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _crashed_store(self, shards: int = 1):
+        """Base con cambios que solo están en el log, como tras un corte"""
+        db = UserDataBase(self.json_path, compact_interval=0, shards=shards)
+        db.add_user("ana", "h1", "Ana")
+        db.add_user("beto", "h2", "Beto")
+        db.compact()
+        db.add_user("carla", "h3", "Carla")
+        db.add_friend("ana", "carla")
+        db.update_user("beto", name="Roberto")
+        # Sin close(): el log queda con las últimas mutaciones
+        db._log.close()
+        self.assertGreater(os.path.getsize(self.json_path + LOG_SUFFIX), 0)
+
+    def _check_sqlite(self):
+        db = SqliteUserDataBase(self.sqlite_path)
+        try:
+            self.assertEqual(len(db), 3)
+            self.assertEqual(db.get_user("carla")["name"], "Carla")
+            self.assertEqual(db.get_user("ana")["friends"], ["carla"])
+            self.assertEqual(db.get_user("carla")["friends"], ["ana"])
+            self.assertEqual(db.get_user("beto")["name"], "Roberto")
+        finally:
+            db.close()
+
+    def test_pending_log(self):
+        self._crashed_store()
+        self.assertEqual(migrate(self.json_path, self.sqlite_path, self.storage), (3, 0))
+        self._check_sqlite()
+
+    def test_shards(self):
+        self._crashed_store(shards=4)
+        self.assertFalse(os.path.exists(self.json_path))
+        self.assertEqual(migrate(self.json_path, self.sqlite_path, self.storage), (3, 0))
+        self._check_sqlite()
+
+    def test_second_run_skips_existing(self):
+        self._crashed_store()
+        migrate(self.json_path, self.sqlite_path, self.storage)
+        self.assertEqual(migrate(self.json_path, self.sqlite_path, self.storage), (0, 3))
+        self._check_sqlite()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Cierre ordenado del servidor: stop() deja la base en disco (log escrito,
+compactado y snapshot binario al día) en los dos motores.
+
+Uso: python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+sys.path.insert(0, SERVER_DIR)
+from binary_snapshot import open_snapshot
+from config import load_config
+from database import LOG_SUFFIX, UserDataBase
+from serverTCP import SocialtecServer
+
+class ShutdownTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # La clave compartida se busca en ../shared respecto del cwd
+        self.server_dir = os.path.join(self.tmp.name, "server")
+        os.makedirs(self.server_dir)
+        self.cwd = os.getcwd()
+        os.chdir(self.server_dir)
+        self.json_path = os.path.join(self.server_dir, "users.json")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def _config(self):
+        config = load_config(os.path.join(self.server_dir, "missing.json"))
+        config["storage"].update({
+            "json_path": self.json_path,
+            "durability": "interval",
+            "flush_interval_ms": 60000.0,  # Nada llega al log antes del cierre
+            "compact_interval": 0,
+            "photos_dir": os.path.join(self.server_dir, "photos")
+        })
+        return config
+
+    def _run(self, engine: str):
+        server = SocialtecServer(host="127.0.0.1", port=0, engine=engine, workers=2,
+                                 hash_workers=0, config=self._config())
+        thread = threading.Thread(target=server.start, daemon=True)
+        thread.start()
+        time.sleep(0.2)
+        server.db.add_user("ana", "hash", "Ana")
+        server.db.add_user("bob", "hash", "Bob")
+        server.db.add_friend("ana", "bob")
+        self.assertEqual(os.path.getsize(self.json_path + LOG_SUFFIX), 0)
+
+        server.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+        reader = open_snapshot(self.json_path + ".snap", self.json_path)
+        self.assertIsNotNone(reader, "falta el snapshot binario o no corresponde al JSON")
+        self.assertEqual(reader.count, 2)
+        reader.close()
+
+        db = UserDataBase(self.json_path, compact_interval=0)
+        self.assertEqual(db.loaded_from, "binary")
+        self.assertEqual(db.get_user("ana")["friends"], ["bob"])
+        db.close()
+
+    def test_thread_engine(self):
+        self._run("thread")
+
+    def test_async_engine(self):
+        self._run("async")
+
+    def test_stop_without_start(self):
+        server = SocialtecServer(host="127.0.0.1", port=0, hash_workers=0, config=self._config())
+        server.db.add_user("ana", "hash", "Ana")
+        server.stop()
+        self.assertIsNotNone(open_snapshot(self.json_path + ".snap", self.json_path))
+
+if __name__ == '__main__':
+    unittest.main()